@@ -1,4 +1,4 @@
-__version__ = (2, 2, 21)
+__version__ = (2, 2, 22)
 
 
 # ▄▀█ █▄ █ █▀█ █▄ █ █▀█ ▀▀█ █▀█ █ █ █▀
@@ -19,21 +19,26 @@ __version__ = (2, 2, 21)
 # meta pic: https://t.me/apodiktum_dumpster/13
 
 # scope: hikka_min 1.3.3
-# requires: emoji alphabet_detector
+# requires: emoji>=2.0.0 alphabet_detector
 
 import ast
 import asyncio
+import bisect
 import collections
 import contextlib
 import copy
+import functools
 import hashlib
+import heapq
 import html
 import io
 import logging
 import math
 import re
+import time
 from datetime import datetime, timedelta
-from typing import IO, Any, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import IO, Any, Callable, Iterator, Optional, Tuple, Union
 
 import aiohttp
 import emoji
@@ -45,9 +50,12 @@ from aiogram.utils.exceptions import (
     ChatNotFound,
     MessageCantBeDeleted,
     MessageToDeleteNotFound,
+    RetryAfter,
 )
-from telethon.errors import UserNotParticipantError
+from telethon.errors import FloodWaitError, UserNotParticipantError
+from telethon.events import ChatAction
 from telethon.hints import EntityLike
+from telethon.tl.custom import ParticipantPermissions
 from telethon.tl.functions.channels import (
     CreateChannelRequest,
     EditAdminRequest,
@@ -66,13 +74,122 @@ from telethon.tl.types import (
     ChatBannedRights,
     Message,
     MessageEntityUrl,
+    MessageService,
+    PeerChannel,
+    PeerChat,
+    PeerUser,
     User,
 )
+from telethon.utils import resolve_id
 
 from .. import loader, utils
 
 logger = logging.getLogger(__name__)
 
+_URL_TLDS = frozenset(
+    (
+        "com net org edu gov mil aero asia biz cat coop info int jobs mobi museum name "
+        "post pro tel travel xxx ac ad ae af ag ai al am an ao aq ar as at au aw ax az "
+        "ba bb bd be bf bg bh bi bj bm bn bo br bs bt bv bw by bz ca cc cd cf cg ch ci "
+        "ck cl cm cn co cr cs cu cv cx cy cz dd de dj dk dm do dz ec ee eg eh er es et "
+        "eu fi fj fk fm fo fr ga gb gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy "
+        "hk hm hn hr ht hu id ie il im in io iq ir is it je jm jo jp ke kg kh ki km kn "
+        "kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md me mg mh mk ml mm mn "
+        "mo mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa "
+        "pe pf pg ph pk pl pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh "
+        "si sj ja sk sl sm sn so sr ss st su sv sx sy sz tc td tf tg th tj tk tl tm tn "
+        "to tp tr tt tv tw tz ua ug uk us uy uz va vc ve vg vi vn vu wf ws ye yt yu za "
+        "zm zw"
+    ).split()
+)
+
+
+def _regex_trie(words: frozenset) -> str:
+    """
+    Builds a regex alternation of the words as a trie, so matching a word
+    never tries more than one branch per character
+    :param words: The words
+    :return: The regex as string
+    """
+    tree = {}
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        chars, branches = [], []
+        for char in sorted(key for key in node if key):
+            if list(node[char]) == [""]:
+                chars.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + build(node[char]))
+        if chars:
+            branches.append(chars[0] if len(chars) == 1 else f"[{''.join(chars)}]")
+        pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(tree)
+
+
+_URL_TLD_REGEX = _regex_trie(_URL_TLDS)
+_URL_REGEX = re.compile(
+    r"(?i)\b((?:https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:"
+    + _URL_TLD_REGEX
+    + r")/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:\'\".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:"
+    + _URL_TLD_REGEX
+    + r")\b/?(?!@)))"
+)
+# every url match contains `http(s):` or `.tld` and never contains whitespace,
+# so only whitespace separated tokens with such a hint need the full regex
+_URL_TOKEN_REGEX = re.compile(
+    r"(?i)(?<!\S)\S*?(?:https?:|\.(?:" + _URL_TLD_REGEX + r")\b)\S*"
+)
+_HREF_REGEX = re.compile("href=[\"'](.*?)[\"']")
+
+
+def _grapheme_length(text: str, until: int) -> int:
+    """
+    Counts the graphemes of the text, but never more than `until`
+    :param text: The text
+    :param until: The count to stop at
+    :return: The amount of graphemes up to `until`
+    """
+    # ascii without CRLF is the only case where every character is one grapheme
+    if text.isascii() and "\r\n" not in text:
+        return min(len(text), max(until, 0))
+    return grapheme.length(text, until)
+
+
+# attribute paths `get_user_id` tries in order, `None` marks the network lookup
+_USER_ID_PATHS = (
+    ("sender_id",),
+    ("action_message", "action", "users", 0),
+    ("action_message", "action", "from_id", "user_id"),
+    ("from_id", "user_id"),
+    ("action_message", "from_id", "user_id"),
+    ("action", "from_user", "id"),
+    None,
+    ("peer_id", "channel_id"),
+    ("from_id",),
+)
+_USER_ID_PATHS_BY_TYPE = {
+    Message: (("sender_id",), ("from_id", "user_id"), ("peer_id", "channel_id")),
+    MessageService: (
+        ("sender_id",),
+        ("from_id", "user_id"),
+        ("peer_id", "channel_id"),
+    ),
+    ChatAction.Event: (
+        ("action_message", "action", "users", 0),
+        ("action_message", "from_id", "user_id"),
+        ("user_id",),
+        None,
+    ),
+}
+_MODERATION_ACTIONS = frozenset(("mute", "unmute", "kick", "ban", "unban"))
+
 
 class ApodiktumLib(loader.Library):
     """
@@ -88,6 +205,42 @@ class ApodiktumLib(loader.Library):
         "_cfg_doc_log_debug": (
             "Wheather to log declared debug messages as info in logger channel."
         ),
+        "_cfg_doc_watcher_q_log_size": (
+            "Size of the watcher queue broadcast log. Methods lagging further behind"
+            " skip the oldest messages."
+        ),
+        "_cfg_doc_watcher_q_stats_interval": (
+            "Interval in seconds to log a summary of the watcher queue metrics, 0 to"
+            " disable."
+        ),
+        "_cfg_doc_entity_cache_size": (
+            "Max amount of entities kept in the entity cache, the least recently"
+            " used are evicted first."
+        ),
+        "_cfg_doc_entity_cache_ttl": "Time in seconds entities are cached.",
+        "_cfg_doc_entity_cache_negative_ttl": (
+            "Time in seconds unresolvable entities are cached."
+        ),
+        "_cfg_doc_invite_link_ttl": (
+            "Time in seconds invite links of private chats are cached, they are"
+            " refreshed in the background shortly before."
+        ),
+        "_cfg_doc_rate_limit": (
+            "Max requests per second of the moderation helpers, counted separately"
+            " for the inline bot and the client, 0 to disable."
+        ),
+        "_cfg_doc_rate_limit_chat": (
+            "Max requests per second and chat of the moderation helpers, 0 to"
+            " disable."
+        ),
+        "_cfg_doc_max_flood_wait": (
+            "Max FloodWait in seconds to wait for and retry the request, longer"
+            " ones fail the request."
+        ),
+        "_cfg_doc_delete_batch_window": (
+            "Time in milliseconds `delete_message(batch=True)` gathers messages of a"
+            " chat to delete them with one request."
+        ),
     }
 
     strings_de = {
@@ -101,6 +254,42 @@ class ApodiktumLib(loader.Library):
             "Ob deklarierte Debug-Meldungen als Info im Logger-Kanal"
             " protokolliert werden sollen."
         ),
+        "_cfg_doc_watcher_q_log_size": (
+            "Größe des Broadcast-Logs der Watcher-Queue. Methoden, die weiter"
+            " zurückliegen, überspringen die ältesten Nachrichten."
+        ),
+        "_cfg_doc_watcher_q_stats_interval": (
+            "Intervall in Sekunden, in dem eine Zusammenfassung der Watcher-Queue"
+            " Metriken protokolliert wird, 0 zum Deaktivieren."
+        ),
+        "_cfg_doc_entity_cache_size": (
+            "Maximale Anzahl der Entitäten im Entitäten-Cache, die am längsten"
+            " nicht genutzten werden zuerst entfernt."
+        ),
+        "_cfg_doc_entity_cache_ttl": "Zeit in Sekunden, die Entitäten gecached werden.",
+        "_cfg_doc_entity_cache_negative_ttl": (
+            "Zeit in Sekunden, die nicht auflösbare Entitäten gecached werden."
+        ),
+        "_cfg_doc_invite_link_ttl": (
+            "Zeit in Sekunden, die Einladungslinks privater Chats gecached werden,"
+            " kurz davor werden sie im Hintergrund erneuert."
+        ),
+        "_cfg_doc_rate_limit": (
+            "Maximale Anfragen pro Sekunde der Moderations-Helfer, getrennt gezählt"
+            " für den Inline-Bot und den Client, 0 zum Deaktivieren."
+        ),
+        "_cfg_doc_rate_limit_chat": (
+            "Maximale Anfragen pro Sekunde und Chat der Moderations-Helfer, 0 zum"
+            " Deaktivieren."
+        ),
+        "_cfg_doc_max_flood_wait": (
+            "Maximaler FloodWait in Sekunden, der abgewartet und danach wiederholt"
+            " wird, längere lassen die Anfrage fehlschlagen."
+        ),
+        "_cfg_doc_delete_batch_window": (
+            "Zeit in Millisekunden, in der `delete_message(batch=True)` Nachrichten"
+            " eines Chats sammelt, um sie mit einer Anfrage zu löschen."
+        ),
     }
 
     strings_ru = {}
@@ -135,6 +324,66 @@ class ApodiktumLib(loader.Library):
                 doc=lambda: self.strings("_cfg_doc_log_debug"),
                 validator=loader.validators.Boolean(),
             ),
+            loader.ConfigValue(
+                "watcher_q_log_size",
+                1000,
+                doc=lambda: self.strings("_cfg_doc_watcher_q_log_size"),
+                validator=loader.validators.Integer(minimum=100),
+            ),
+            loader.ConfigValue(
+                "watcher_q_stats_interval",
+                0,
+                doc=lambda: self.strings("_cfg_doc_watcher_q_stats_interval"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "entity_cache_size",
+                1000,
+                doc=lambda: self.strings("_cfg_doc_entity_cache_size"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "entity_cache_ttl",
+                300,
+                doc=lambda: self.strings("_cfg_doc_entity_cache_ttl"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "entity_cache_negative_ttl",
+                60,
+                doc=lambda: self.strings("_cfg_doc_entity_cache_negative_ttl"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "invite_link_ttl",
+                3600,
+                doc=lambda: self.strings("_cfg_doc_invite_link_ttl"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "rate_limit",
+                20,
+                doc=lambda: self.strings("_cfg_doc_rate_limit"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "rate_limit_chat",
+                5,
+                doc=lambda: self.strings("_cfg_doc_rate_limit_chat"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "max_flood_wait",
+                600,
+                doc=lambda: self.strings("_cfg_doc_max_flood_wait"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
+            loader.ConfigValue(
+                "delete_batch_window",
+                500,
+                doc=lambda: self.strings("_cfg_doc_delete_batch_window"),
+                validator=loader.validators.Integer(minimum=0),
+            ),
         )
 
     async def init(self):
@@ -162,8 +411,25 @@ class ApodiktumLib(loader.Library):
             self._watcher_q_queue = {}
         if not hasattr(self, "_watcher_q_task"):
             self._watcher_q_task = {}
+        if not hasattr(self, "_watcher_q_config"):
+            self._watcher_q_config = {}
+        if not hasattr(self, "_watcher_q_log"):
+            self._watcher_q_log = {}
+        if not hasattr(self, "_watcher_q_cursor"):
+            self._watcher_q_cursor = {}
+        if not hasattr(self, "_watcher_q_stats"):
+            self._watcher_q_stats = {}
+        self._entity_cache = ApodiktumEntityCache(self.client, self.config)
+        self._invite_links = ApodiktumInviteLinkCache(
+            self.client,
+            self.db,
+            self.__class__.__name__,
+            self.config,
+        )
+        self._rate_limiter = ApodiktumRateLimiter(self.config)
         await self.__init_classes()
         await self.__refresh_classes()
+        self.utils._delete_scheduler.start()
         self._acl_task = asyncio.ensure_future(
             self._controllerloader.ensure_controller()
         )
@@ -233,9 +499,17 @@ class ApodiktumLib(loader.Library):
             self._acl_task.cancel()
         with contextlib.suppress(Exception):
             self._ss_task.cancel()
+        with contextlib.suppress(Exception):
+            self.watcher_q._stats_task.cancel()
+        with contextlib.suppress(Exception):
+            self.utils._delete_scheduler.stop()
         (
             new_lib._watcher_q_queue,
             new_lib._watcher_q_task,
+            new_lib._watcher_q_config,
+            new_lib._watcher_q_log,
+            new_lib._watcher_q_cursor,
+            new_lib._watcher_q_stats,
         ) = self._internal._lib_update_watcher_q_handler()
         self.utils.log(
             logging.DEBUG,
@@ -386,11 +660,222 @@ class ApodiktumControllerLoader(loader.Module):
             await asyncio.sleep(delay)
 
 
+class ApodiktumWatcherQueueBuffer(asyncio.Queue):
+    """
+    Bounded queue of the ApodiktumWatcherQueue, applies an overflow policy if full.
+    Entries are kept in priority lanes, higher lanes are drained first and
+    waiting entries gain one lane of priority per `aging` seconds.
+    With `coalesce_edits` a newer version of a queued message (same chat and
+    message id) replaces the queued one, with `debounce` a dequeued message is
+    held until it had no newer version for `debounce` seconds.
+    """
+
+    overflow_policies = ("block", "drop_oldest", "drop_newest", "coalesce")
+    priorities = ("high", "normal", "low")
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        overflow: str = "block",
+        classify: Optional[Callable] = None,
+        aging: float = 1.0,
+        coalesce_edits: bool = False,
+        debounce: float = 0,
+    ):
+        super().__init__(maxsize)
+        self.overflow = overflow
+        self.classify = classify
+        self.aging = aging
+        self.coalesce_edits = coalesce_edits or debounce > 0
+        self.debounce = debounce
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _init(self, maxsize: int):
+        self._queue = [collections.deque() for _ in self.priorities]
+        self._size = 0
+        self._latest = {}
+
+    def _key(self, entry: "ApodiktumWatcherQueueEntry") -> Optional[tuple]:
+        if not self.coalesce_edits or getattr(entry.message, "id", None) is None:
+            return None
+        return entry.chat_id, entry.message.id
+
+    def _put(self, entry: "ApodiktumWatcherQueueEntry"):
+        self._queue[self.classify(entry) if self.classify else 1].append(entry)
+        self._size += 1
+        if (key := self._key(entry)) is not None:
+            self._latest.setdefault(key, entry)
+
+    def _get(self) -> "ApodiktumWatcherQueueEntry":
+        now = time.monotonic()
+        best, best_rank = None, None
+        for lane, queue in enumerate(self._queue):
+            if not queue:
+                continue
+            rank = lane - (now - queue[0].ts) / self.aging if self.aging else lane
+            if best is None or rank < best_rank:
+                best, best_rank = lane, rank
+        self._size -= 1
+        entry = self._queue[best].popleft()
+        if (key := self._key(entry)) is None:
+            return entry
+        return (
+            self._latest.get(key, entry)
+            if self.debounce
+            else self._latest.pop(key, entry)
+        )
+
+    async def settle(self, entry: "ApodiktumWatcherQueueEntry"):
+        """
+        Waits until a dequeued message had no newer version for `debounce`
+        seconds, newer versions arriving meanwhile replace it
+        :param entry: The dequeued log entry
+        :return: The latest version of the log entry
+        """
+        if not self.debounce or (key := self._key(entry)) is None:
+            return entry
+        while (
+            wait := self.debounce
+            - (time.monotonic() - self._latest.get(key, entry).ts)
+        ) > 0:
+            await asyncio.sleep(wait)
+        return self._latest.pop(key, entry)
+
+    def qsize(self) -> int:
+        return self._size
+
+    def requeue(self, entries: list, front: bool = False):
+        """
+        Puts entries back into their lanes, maxsize and the overflow policy
+        are ignored so nothing gets dropped
+        :param entries: The log entries
+        :param front: Put them in front of their lanes (e.g. an unfinished batch)
+        :return: None
+        """
+        for entry in reversed(entries) if front else entries:
+            lane = self._queue[self.classify(entry) if self.classify else 1]
+            if front:
+                lane.appendleft(entry)
+            else:
+                lane.append(entry)
+            self._size += 1
+            self._unfinished_tasks += 1
+            if (key := self._key(entry)) is not None:
+                self._latest.setdefault(key, entry)
+        if entries:
+            self._finished.clear()
+            self._wakeup_next(self._getters)
+
+    def empty(self) -> bool:
+        return not self._size
+
+    async def put_entry(self, entry: "ApodiktumWatcherQueueEntry"):
+        """
+        Puts a log entry into the queue, if full the overflow policy decides:
+        `block` waits for a free slot, `drop_oldest` drops the oldest queued entry
+        of the lowest lane, `drop_newest` drops the new entry and `coalesce`
+        replaces the latest queued entry of the same chat (or drops the oldest
+        if there is none)
+        :param entry: The log entry to queue
+        :return: None
+        """
+        if (key := self._key(entry)) is not None and key in self._latest:
+            self._latest[key] = entry
+            self.coalesced += 1
+            return
+        if not self.full():
+            return self.put_nowait(entry)
+        if self.overflow == "block":
+            return await self.put(entry)
+        self.dropped += 1
+        if self.overflow == "drop_newest":
+            return
+        if self.overflow == "coalesce":
+            for queue in reversed(self._queue):
+                for index in range(len(queue) - 1, -1, -1):
+                    if queue[index].chat_id == entry.chat_id:
+                        if (old_key := self._key(queue[index])) is not None:
+                            self._latest.pop(old_key, None)
+                        if key is not None:
+                            self._latest[key] = entry
+                        queue[index] = entry
+                        return
+        for queue in reversed(self._queue):
+            if queue:
+                if (old_key := self._key(queue.popleft())) is not None:
+                    self._latest.pop(old_key, None)
+                self._size -= 1
+                self.task_done()
+                break
+        self.put_nowait(entry)
+
+    async def get_batch(self, max_batch: int, max_latency: float) -> list:
+        """
+        Waits for a message and drains the queue until the batch is full
+        or `max_latency` seconds passed since the first message
+        :param max_batch: The max amount of messages in the batch
+        :param max_latency: The max time in seconds to wait for a full batch
+        :return: List of log entries
+        """
+        batch = [await self.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_latency
+        getter = None
+        try:
+            while len(batch) < max_batch:
+                while not self.empty() and len(batch) < max_batch:
+                    batch.append(self.get_nowait())
+                timeout = deadline - loop.time()
+                if len(batch) >= max_batch or timeout <= 0:
+                    break
+                getter = asyncio.ensure_future(self.get())
+                await asyncio.wait({getter}, timeout=timeout)
+                if not getter.done():
+                    getter.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    batch.append(await getter)
+                getter = None
+        except asyncio.CancelledError:
+            if getter is not None and getter.done() and not getter.cancelled():
+                batch.append(getter.result())
+            elif getter is not None:
+                getter.cancel()
+            self.requeue(batch, front=True)
+            raise
+        return batch
+
+
+class ApodiktumWatcherQueueEntry:
+    """
+    Message of the ApodiktumWatcherQueue broadcast log, shared by all readers
+    """
+
+    __slots__ = ("message", "chat_id", "priority", "ts", "targets")
+
+    def __init__(
+        self,
+        message: Message,
+        chat_id: int,
+        priority: Optional[str] = None,
+    ):
+        self.message = message
+        self.chat_id = chat_id
+        self.priority = priority
+        self.ts = time.monotonic()
+        self.targets = None
+
+
 class ApodiktumWatcherQueue(loader.Module):
     """
     Apodiktum Watcher Queue queues messages for the watcher
     """
 
+    lag_policies = ("skip", "latest", "unregister")
+    stats_buckets = (1, 5, 10, 50, 100, 500, 1000, 5000)
+    # seconds a resolved module method is used before checking if it is still loaded
+    handler_check_interval = 1
+
     def __init__(
         self,
         lib: loader.Library,
@@ -411,7 +896,20 @@ class ApodiktumWatcherQueue(loader.Module):
         self._chats_db = self._lib_db.setdefault("chats", {})
         self._watcher_q_queue = lib._watcher_q_queue
         self._watcher_q_task = lib._watcher_q_task
+        self._watcher_q_config = lib._watcher_q_config
+        self._watcher_q_log = lib._watcher_q_log
+        self._watcher_q_cursor = lib._watcher_q_cursor
+        self._watcher_q_stats = lib._watcher_q_stats
+        self.__init_log(self.lib.config["watcher_q_log_size"])
+        self._watcher_q_index = {}
+        self._watcher_q_filters = {}
+        self._watcher_q_handlers = {}
+        self._watcher_q_handoff = {}
+        self._watcher_q_busy = set()
+        self._watcher_q_retired = set()
+        self._stopping = False
         self.__init_old_watcher_handler()
+        self._stats_task = asyncio.ensure_future(self.__stats_logger())
 
     async def _refresh_lib(
         self,
@@ -427,36 +925,267 @@ class ApodiktumWatcherQueue(loader.Module):
         self.utils = lib.utils
         return self
 
+    def __init_log(self, size: int):
+        """
+        Initializes the broadcast log, keeps the entries of the old log
+        :param size: The max amount of messages in the log
+        """
+        entries = self._watcher_q_log.get("entries", ())
+        if getattr(entries, "maxlen", None) != size:
+            self._watcher_q_log["entries"] = collections.deque(entries, maxlen=size)
+        self._watcher_q_log.setdefault("seq", 0)
+
     def __init_old_watcher_handler(self):
         """
-        Initializes the old watcher handler
+        Initializes the old watcher handler, the new workers adopt the queued
+        messages and start once the old workers finished their current messages
         """
         if not getattr(self, "first_run", True):
             return
         self.first_run = False
         for name in list(self._watcher_q_task):
             for method in list(self._watcher_q_task[name]):
-                self._watcher_q_task[name].pop(method)
-                self.register(name, method)
-            if not self._watcher_q_queue[name]:
+                old_tasks = self._watcher_q_task[name].pop(method)
+                old_queues = self._watcher_q_queue.get(name, {}).pop(method, [])
+                # libraries up to 2.2.21 hand over one task and one plain queue
+                if not isinstance(old_tasks, list):
+                    old_tasks = [old_tasks]
+                if not isinstance(old_queues, list):
+                    old_queues = []
+                self.register(
+                    name,
+                    method,
+                    **self._watcher_q_config.get(name, {}).get(method, {}),
+                )
+                if method not in self._watcher_q_task.get(name, {}):
+                    self._watcher_q_cursor.get(name, {}).pop(method, None)
+                    continue
+                self._watcher_q_handoff[(name, method)] = asyncio.ensure_future(
+                    self.__adopt(
+                        old_tasks, old_queues, self._watcher_q_queue[name][method]
+                    )
+                )
+            if not self._watcher_q_queue.get(name):
                 self._watcher_q_task.pop(name)
 
-    async def msg_reciever(self, message: Message):
+    @staticmethod
+    async def __adopt(old_tasks: list, old_queues: list, queues: list):
+        """
+        Waits for the old reader and workers to stop and moves their queued
+        messages in front of the new queues
+        :param old_tasks: The tasks of the old library
+        :param old_queues: The queues of the old library
+        :param queues: The queues to adopt the messages
+        :return: None
+        """
+        if old_tasks:
+            await asyncio.wait(old_tasks)
+        adopted = [[] for _ in queues]
+        for old_queue in old_queues:
+            while not old_queue.empty():
+                entry = old_queue.get_nowait()
+                adopted[entry.chat_id % len(queues)].append(entry)
+        for queue, entries in zip(queues, adopted):
+            queue.requeue(entries, front=True)
+
+    async def msg_reciever(self, message: Message, priority: Optional[str] = None):
         """
         !do not use this method directly, it will be used by `apolib_controller.py`!
-        Recieves messages and queues them for the handler.
+        Recieves messages and appends them once to the broadcast log,
+        every registered method reads the log with its own cursor.
+        The message is routed once, it is queued right away for matching methods
+        whose readers are idle, only the other matching readers are woken up.
         :param message: The message to queue
+        :param priority: The lane of the message (`high`, `normal` or `low`),
+                         overrides the priority of the registered methods
         :return: None
         """
-        for sub_queue in self._watcher_q_queue:
-            for queue in self._watcher_q_queue[sub_queue].values():
-                await queue.put(message)
+        log = self._watcher_q_log
+        entry = ApodiktumWatcherQueueEntry(
+            message, utils.get_chat_id(message), priority
+        )
+        entry.targets = self.__route(message, entry.chat_id)
+        log["entries"].append(entry)
+        seq = log["seq"]
+        log["seq"] += 1
+        for name, method in entry.targets:
+            cursor = self._watcher_q_cursor.get(name, {}).get(method)
+            if not cursor or not (event := cursor.get("event")) or event.is_set():
+                continue
+            queues = self._watcher_q_queue[name][method]
+            queue = queues[entry.chat_id % len(queues)]
+            if queue.full() and queue.overflow == "block":
+                # the messages before were appended while the reader was idle
+                # and aren't meant for it
+                cursor["wake"] = seq
+                event.set()
+                continue
+            await self.__queue_entry(name, method, entry)
+            cursor["seq"] = seq + 1
+
+    def __lane(
+        self,
+        entry: ApodiktumWatcherQueueEntry,
+        name: str,
+        method: str,
+        priority: Union[str, Callable],
+    ) -> int:
+        """
+        Gets the priority lane of an entry for a registered method
+        :param entry: The log entry
+        :param name: The name of the module
+        :param method: The method
+        :param priority: The priority or classifier of the method
+        :return: The index of the lane
+        """
+        lane = entry.priority
+        if lane is None and callable(priority):
+            try:
+                lane = priority(entry.message)
+            except Exception as exc:  # skipcq: PYL-W0703
+                self.utils.log(
+                    logging.ERROR,
+                    name,
+                    f"Exception in priority classifier of `{method}` of `{name}`:"
+                    f"\n{exc}",
+                    exc_info=True,
+                )
+        elif lane is None:
+            lane = priority
+        priorities = ApodiktumWatcherQueueBuffer.priorities
+        return priorities.index(lane) if lane in priorities else 1
+
+    def __route(self, message: Message, chat_id: int) -> set:
+        """
+        Gets the registered methods whose filters match the message,
+        only the methods without chat filter and the ones of the chat are checked
+        :param message: The message to route
+        :param chat_id: The chat id of the message
+        :return: Set of (name, method)
+        """
+        return {
+            key
+            for chat in (None, chat_id)
+            for key in self._watcher_q_index.get(chat, ())
+            if all(check(message) for check in self._watcher_q_filters[key])
+        }
+
+    @staticmethod
+    def _sender_type(message: Message) -> Optional[str]:
+        """
+        Gets the sender type of a message without fetching the sender,
+        service messages come as `ChatAction.Event` with the `action_message`
+        :param message: The message
+        :return: `user`, `bot`, `channel`, `chat` or None
+        """
+        sender = getattr(message, "sender", None)
+        if isinstance(sender, User):
+            return "bot" if sender.bot else "user"
+        if isinstance(sender, Channel):
+            return "channel"
+        if isinstance(message, ChatAction.Event):
+            if getattr(message.action_message, "from_id", None) is None:
+                if message.user_id:
+                    return "user"
+            message = message.action_message
+        peer = getattr(message, "from_id", None) or getattr(message, "peer_id", None)
+        if isinstance(peer, PeerUser):
+            return "user"
+        if isinstance(peer, PeerChannel):
+            return "channel"
+        if isinstance(peer, PeerChat):
+            return "chat"
+        return None
 
-    def register(self, name: str, method: str = "q_watcher"):
+    def __compile_filters(
+        self,
+        outgoing: Optional[bool] = None,
+        sender_types: Optional[list] = None,
+        media: Optional[bool] = None,
+        actions: Optional[list] = None,
+        pattern: Optional[Union[str, re.Pattern]] = None,
+    ) -> tuple:
+        """
+        Compiles the filters of a registered method into checks
+        :return: Tuple of checks, each takes the message and returns a bool
+        """
+        checks = []
+        if outgoing is not None:
+            checks.append(lambda m: bool(getattr(m, "out", False)) == outgoing)
+        if sender_types:
+            sender_types = frozenset(sender_types)
+            checks.append(lambda m: self._sender_type(m) in sender_types)
+        if media is not None:
+            checks.append(lambda m: bool(getattr(m, "media", None)) == media)
+        if actions:
+            actions = tuple(actions)
+            checks.append(
+                lambda m: isinstance(
+                    getattr(m, "action", None)
+                    or getattr(getattr(m, "action_message", None), "action", None),
+                    actions,
+                )
+            )
+        if pattern is not None:
+            regex = re.compile(pattern) if isinstance(pattern, str) else pattern
+            checks.append(
+                lambda m: regex.search(getattr(m, "raw_text", None) or "") is not None
+            )
+        return tuple(checks)
+
+    def register(
+        self,
+        name: str,
+        method: str = "q_watcher",
+        maxsize: int = 0,
+        overflow: str = "block",
+        concurrency: int = 1,
+        chats: Optional[list] = None,
+        outgoing: Optional[bool] = None,
+        sender_types: Optional[list] = None,
+        media: Optional[bool] = None,
+        actions: Optional[list] = None,
+        pattern: Optional[Union[str, re.Pattern]] = None,
+        max_batch: int = 1,
+        max_latency_ms: int = 0,
+        max_lag: int = 0,
+        lag_policy: str = "skip",
+        priority: Union[str, Callable] = "normal",
+        aging_ms: int = 1000,
+        coalesce_edits: bool = False,
+        debounce_ms: int = 0,
+    ):
         """
         Adds a new method to the queue
         :param name: The name of the module
         :param method: The method to use for the queue
+        :param maxsize: The max amount of queued messages per worker, 0 for unbounded
+        :param overflow: What to do if the queue is full:
+                         `block`, `drop_oldest`, `drop_newest` or `coalesce` (per chat)
+        :param concurrency: The amount of workers, messages are sharded by chat id,
+                            so a chat stays in order while other chats run in parallel
+        :param chats: Only queue messages of these chat ids
+        :param outgoing: Only queue outgoing (True) or incoming (False) messages
+        :param sender_types: Only queue messages of these sender types:
+                             `user`, `bot`, `channel` or `chat`
+        :param media: Only queue messages with (True) or without (False) media
+        :param actions: Only queue service messages of these `MessageAction` types
+        :param pattern: Only queue messages whose text matches this regex
+        :param max_batch: If > 1 the method gets a list of up to `max_batch` messages
+        :param max_latency_ms: The max time to wait for a full batch in milliseconds
+        :param max_lag: The max amount of log messages the method may lag behind,
+                        0 for the log size
+        :param lag_policy: What to do if the method lags too far behind:
+                           `skip` the oldest messages, jump to the `latest` message
+                           or `unregister` the method
+        :param priority: The lane of the messages (`high`, `normal` or `low`) or
+                         a classifier which gets the message and returns the lane
+        :param aging_ms: Queued messages gain one lane per `aging_ms`, 0 to disable
+        :param coalesce_edits: A newer version of a queued message (edits or repeated
+                               updates of the same chat and message id) replaces it
+        :param debounce_ms: Hold a message until it had no newer version for
+                            `debounce_ms`, collapses edit bursts (implies
+                            `coalesce_edits`)
         :return: None
         """
         if not hasattr(self.lib.lookup(name), method):
@@ -466,10 +1195,140 @@ class ApodiktumWatcherQueue(loader.Module):
                 f"Module `{name}` has no method called `{method}`!",
             )
             return
-        self._watcher_q_queue.setdefault(name, {}).setdefault(method, asyncio.Queue())
-        self._watcher_q_task.setdefault(name, {}).setdefault(
-            method, asyncio.create_task(self.__queue_method_handler(name, method))
+        if overflow not in ApodiktumWatcherQueueBuffer.overflow_policies:
+            self.utils.log(
+                logging.ERROR,
+                self.__class__.__name__,
+                f"Unknown overflow policy `{overflow}` for method `{method}` of"
+                f" `{name}`!",
+            )
+            return
+        if lag_policy not in self.lag_policies:
+            self.utils.log(
+                logging.ERROR,
+                self.__class__.__name__,
+                f"Unknown lag policy `{lag_policy}` for method `{method}` of `{name}`!",
+            )
+            return
+        if not callable(priority) and (
+            priority not in ApodiktumWatcherQueueBuffer.priorities
+        ):
+            self.utils.log(
+                logging.ERROR,
+                self.__class__.__name__,
+                f"Unknown priority `{priority}` for method `{method}` of `{name}`!",
+            )
+            return
+        concurrency = max(int(concurrency), 1)
+        config = {
+            "maxsize": maxsize,
+            "overflow": overflow,
+            "concurrency": concurrency,
+            "chats": chats,
+            "outgoing": outgoing,
+            "sender_types": sender_types,
+            "media": media,
+            "actions": actions,
+            "pattern": pattern,
+            "max_batch": max_batch,
+            "max_latency_ms": max_latency_ms,
+            "max_lag": max_lag,
+            "lag_policy": lag_policy,
+            "priority": priority,
+            "aging_ms": aging_ms,
+            "coalesce_edits": coalesce_edits,
+            "debounce_ms": debounce_ms,
+        }
+        retired = None
+        if method in self._watcher_q_task.get(name, {}):
+            if self._watcher_q_config.get(name, {}).get(method) == config:
+                # a reloaded module registers again, resolve its new instance
+                self._watcher_q_handlers.pop((name, method), None)
+                return
+            # e.g. a reloaded module registers again with new options or a classifier
+            # of the new instance, the new workers adopt the queued messages
+            retired = self.__retire(name, method)
+        self._watcher_q_config.setdefault(name, {})[method] = config
+        self._watcher_q_filters[(name, method)] = self.__compile_filters(
+            outgoing, sender_types, media, actions, pattern
+        )
+        for chat in {resolve_id(int(chat))[0] for chat in chats} if chats else (None,):
+            self._watcher_q_index.setdefault(chat, set()).add((name, method))
+        self._watcher_q_queue.setdefault(name, {}).setdefault(
+            method,
+            [
+                ApodiktumWatcherQueueBuffer(
+                    maxsize,
+                    overflow,
+                    functools.partial(
+                        self.__lane, name=name, method=method, priority=priority
+                    ),
+                    aging_ms / 1000,
+                    coalesce_edits,
+                    debounce_ms / 1000,
+                )
+                for _ in range(concurrency)
+            ],
+        )
+        self._watcher_q_cursor.setdefault(name, {}).setdefault(
+            method, {"seq": self._watcher_q_log["seq"], "skipped": 0}
+        )
+        self._watcher_q_stats.setdefault(name, {}).setdefault(
+            method,
+            {
+                "processed": 0,
+                "exceptions": 0,
+                "peak_depth": 0,
+                "since": time.monotonic(),
+                "latency": [0] * (len(self.stats_buckets) + 1),
+                "handler_time": [0] * (len(self.stats_buckets) + 1),
+            },
         )
+        self._watcher_q_task.setdefault(name, {})[method] = [
+            asyncio.create_task(self.__queue_reader(name, method))
+        ] + [
+            asyncio.create_task(self.__queue_method_handler(name, method, shard))
+            for shard in range(concurrency)
+        ]
+        if retired is not None:
+            self._watcher_q_handoff[(name, method)] = asyncio.ensure_future(
+                self.__adopt(*retired, self._watcher_q_queue[name][method])
+            )
+
+    def __retire(self, name: str, method: str) -> Tuple[list, list]:
+        """
+        Detaches the tasks and queues of a registered method, idle tasks are
+        cancelled and busy workers stop after their current messages.
+        The cursor and the stats are kept for the new registration.
+        :param name: The name of the module
+        :param method: The method
+        :return: The old tasks and the old queues
+        """
+        old_tasks = self._watcher_q_task[name].pop(method)
+        for task in old_tasks:
+            if task in self._watcher_q_busy:
+                self._watcher_q_retired.add(task)
+                task.add_done_callback(self._watcher_q_retired.discard)
+            else:
+                task.cancel()
+        if handoff := self._watcher_q_handoff.pop((name, method), None):
+            old_tasks.append(handoff)
+        self._watcher_q_filters.pop((name, method), None)
+        self._watcher_q_handlers.pop((name, method), None)
+        self.__unindex(name, method)
+        return old_tasks, self._watcher_q_queue[name].pop(method)
+
+    def __unindex(self, name: str, method: str):
+        """
+        Removes a registered method from the chat index of the router
+        :param name: The name of the module
+        :param method: The method
+        :return: None
+        """
+        for chat in list(self._watcher_q_index):
+            self._watcher_q_index[chat].discard((name, method))
+            if not self._watcher_q_index[chat]:
+                self._watcher_q_index.pop(chat)
 
     def unregister(self, name: str, method: str = "q_watcher"):
         """
@@ -478,13 +1337,27 @@ class ApodiktumWatcherQueue(loader.Module):
         :param method: The method to remove
         :return: None
         """
-        self._watcher_q_task[name][method].cancel()
-        self._watcher_q_task[name].pop(method)
+        for task in self._watcher_q_task[name].pop(method):
+            task.cancel()
+        self._watcher_q_filters.pop((name, method), None)
+        self._watcher_q_handlers.pop((name, method), None)
+        if handoff := self._watcher_q_handoff.pop((name, method), None):
+            handoff.cancel()
+        self.__unindex(name, method)
         self._watcher_q_queue[name].pop(method)
+        self._watcher_q_config.get(name, {}).pop(method, None)
+        self._watcher_q_cursor.get(name, {}).pop(method, None)
+        self._watcher_q_stats.get(name, {}).pop(method, None)
         if not self._watcher_q_task[name]:
             self._watcher_q_task.pop(name)
         if not self._watcher_q_queue[name]:
             self._watcher_q_queue.pop(name)
+        if name in self._watcher_q_config and not self._watcher_q_config[name]:
+            self._watcher_q_config.pop(name)
+        if name in self._watcher_q_cursor and not self._watcher_q_cursor[name]:
+            self._watcher_q_cursor.pop(name)
+        if name in self._watcher_q_stats and not self._watcher_q_stats[name]:
+            self._watcher_q_stats.pop(name)
         self.utils.log(
             logging.DEBUG,
             self.__class__.__name__,
@@ -493,20 +1366,279 @@ class ApodiktumWatcherQueue(loader.Module):
             debug_msg=True,
         )
 
-    async def __queue_method_handler(self, name: str, method: str):
+    def _stop(self):
+        """
+        !do not use this method directly, it is used on library updates!
+        Stops the readers and idle workers, busy workers finish their current
+        messages first. Queued messages stay in the queues for the new library,
+        unfinished handoffs are handed over with the tasks, so the new library
+        waits for them before it adopts the queues.
+        :return: None
+        """
+        self._stopping = True
+        for name in list(self._watcher_q_task):
+            for method, tasks in list(self._watcher_q_task[name].items()):
+                for task in tasks:
+                    if task not in self._watcher_q_busy:
+                        task.cancel()
+                if handoff := self._watcher_q_handoff.pop((name, method), None):
+                    tasks.append(handoff)
+
+    def get_dropped(self, name: Optional[str] = None) -> dict:
+        """
+        Gets the amount of messages dropped by the overflow and lag policies
+        :param name: The name of the module, None for all modules
+        :return: The dropped messages as {name: {method: count}}
+        """
+        return {
+            sub_queue: {
+                method: sum(queue.dropped for queue in queues)
+                + self._watcher_q_cursor.get(sub_queue, {})
+                .get(method, {})
+                .get("skipped", 0)
+                for method, queues in self._watcher_q_queue[sub_queue].items()
+            }
+            for sub_queue in self._watcher_q_queue
+            if name is None or sub_queue == name
+        }
+
+    def get_stats(
+        self,
+        name: Optional[str] = None,
+        method: Optional[str] = None,
+    ) -> dict:
+        """
+        Gets the metrics of the registered methods
+        :param name: The name of the module, None for all modules
+        :param method: The method, None for all methods
+        :return: The metrics as {name: {method: metrics}}, latency (enqueue to
+                 dispatch) and handler_time are histograms in milliseconds
+        """
+        now = time.monotonic()
+        dropped = self.get_dropped(name)
+        stats = {}
+        for sub_queue in self._watcher_q_stats:
+            if name is not None and sub_queue != name:
+                continue
+            for meth, meth_stats in self._watcher_q_stats[sub_queue].items():
+                if method is not None and meth != method:
+                    continue
+                queues = self._watcher_q_queue.get(sub_queue, {}).get(meth, [])
+                cursor = self._watcher_q_cursor.get(sub_queue, {}).get(meth, {})
+                # idle readers skip the messages which aren't meant for them
+                lag = (
+                    0
+                    if (event := cursor.get("event")) and not event.is_set()
+                    else self._watcher_q_log["seq"] - cursor.get("seq", 0)
+                )
+                stats.setdefault(sub_queue, {})[meth] = {
+                    "depth": sum(queue.qsize() for queue in queues),
+                    "peak_depth": meth_stats["peak_depth"],
+                    "lag": lag,
+                    "dropped": dropped.get(sub_queue, {}).get(meth, 0),
+                    "coalesced": sum(queue.coalesced for queue in queues),
+                    "processed": meth_stats["processed"],
+                    "exceptions": meth_stats["exceptions"],
+                    "throughput": meth_stats["processed"]
+                    / max(now - meth_stats["since"], 1),
+                    "latency": self.__histogram(meth_stats["latency"]),
+                    "handler_time": self.__histogram(meth_stats["handler_time"]),
+                }
+        return stats
+
+    def __histogram(self, counts: list) -> dict:
+        """
+        Labels the buckets of a histogram
+        :param counts: The counts of the buckets
+        :return: The histogram as {label: count}
+        """
+        return {
+            **{
+                f"<={bound}ms": count
+                for bound, count in zip(self.stats_buckets, counts)
+            },
+            f">{self.stats_buckets[-1]}ms": counts[-1],
+        }
+
+    def __percentile(self, counts: list, percentile: float) -> str:
+        """
+        Gets the bucket of a histogram which contains the percentile
+        :param counts: The counts of the buckets
+        :param percentile: The percentile between 0 and 1
+        :return: The label of the bucket
+        """
+        if not any(counts):
+            return "-"
+        target = sum(counts) * percentile
+        for label, count in self.__histogram(counts).items():
+            target -= count
+            if target <= 0:
+                return label
+        return label
+
+    async def __stats_logger(self):
+        """
+        Logs a summary of the metrics every `watcher_q_stats_interval` seconds
+        """
+        processed = {}
+        with contextlib.suppress(asyncio.CancelledError):
+            while True:
+                interval = self.lib.config["watcher_q_stats_interval"]
+                await asyncio.sleep(interval or 60)
+                if not interval or not self._watcher_q_stats:
+                    continue
+                lines = []
+                for sub_queue, methods in self.get_stats().items():
+                    for meth, stats in methods.items():
+                        rate = (
+                            stats["processed"] - processed.get((sub_queue, meth), 0)
+                        ) / interval
+                        processed[(sub_queue, meth)] = stats["processed"]
+                        meth_stats = self._watcher_q_stats[sub_queue][meth]
+                        lines.append(
+                            f"{sub_queue}.{meth}: depth {stats['depth']} (peak"
+                            f" {stats['peak_depth']}) | lag {stats['lag']} |"
+                            f" dropped {stats['dropped']} | {rate:.1f} msg/s |"
+                            " latency p95"
+                            f" {self.__percentile(meth_stats['latency'], 0.95)} |"
+                            " handler p95"
+                            f" {self.__percentile(meth_stats['handler_time'], 0.95)}"
+                            f" | exceptions {stats['exceptions']}"
+                        )
+                self.utils.log(
+                    logging.INFO,
+                    self.__class__.__name__,
+                    "Watcher queue stats:\n" + "\n".join(lines),
+                )
+
+    async def __queue_reader(self, name: str, method: str):
+        """
+        Reads the broadcast log from the cursor of a method
+        and queues the matching messages for its workers
+        :param name: The name of the module
+        :param method: The method to read the log for
+        :return: None
+        """
+        log = self._watcher_q_log
+        config = self._watcher_q_config.get(name, {}).get(method, {})
+        max_lag = config.get("max_lag") or log["entries"].maxlen
+        key = (name, method)
+        try:
+            while True:
+                try:
+                    cursor = self._watcher_q_cursor[name][method]
+                    head = log["seq"]
+                    if cursor["seq"] >= head:
+                        event = cursor.get("event")
+                        if event is None or event.is_set():
+                            event = cursor["event"] = asyncio.Event()
+                        await event.wait()
+                        cursor["seq"] = max(cursor["seq"], cursor.pop("wake", 0))
+                        continue
+                    lag = head - cursor["seq"]
+                    if lag > min(max_lag, len(log["entries"])):
+                        if config.get("lag_policy") == "unregister":
+                            self.utils.log(
+                                logging.ERROR,
+                                self.__class__.__name__,
+                                f"Method `{method}` of `{name}` lags {lag} messages"
+                                " behind, unregistering it!",
+                            )
+                            return self.unregister(name, method)
+                        keep = (
+                            1
+                            if config.get("lag_policy") == "latest"
+                            else min(max_lag, len(log["entries"]))
+                        )
+                        cursor["skipped"] += lag - keep
+                        cursor["seq"] = head - keep
+                        continue
+                    entry = log["entries"][cursor["seq"] - head]
+                    if entry.targets is None:
+                        entry.targets = self.__route(entry.message, entry.chat_id)
+                    if key in entry.targets:
+                        await self.__queue_entry(name, method, entry)
+                    cursor["seq"] += 1
+                except KeyError:
+                    self.utils.log(
+                        logging.DEBUG,
+                        self.__class__.__name__,
+                        f"Reader stopped! Method `{method}` of `{name}` is not"
+                        " registered!",
+                        debug_msg=True,
+                    )
+                    break
+        except asyncio.CancelledError:
+            return
+
+    async def __queue_entry(
+        self, name: str, method: str, entry: ApodiktumWatcherQueueEntry
+    ):
+        """
+        Queues a log entry for the workers of a method
+        :param name: The name of the module
+        :param method: The method
+        :param entry: The log entry
+        :return: None
+        """
+        queues = self._watcher_q_queue[name][method]
+        await queues[entry.chat_id % len(queues)].put_entry(entry)
+        stats = self._watcher_q_stats[name][method]
+        stats["peak_depth"] = max(
+            stats["peak_depth"], sum(queue.qsize() for queue in queues)
+        )
+
+    def __handler(self, name: str, method: str) -> Optional[Callable]:
+        """
+        Gets the bound method of a module, it is resolved once and cached until
+        the module registers again (e.g. after a reload), whether the module is
+        still loaded is checked at most once per `handler_check_interval`
+        :param name: The name of the module
+        :param method: The method
+        :return: The bound method or None if the module has no such method
+        """
+        module, handler, checked = self._watcher_q_handlers.get(
+            (name, method), (None, None, 0)
+        )
+        if module is not None:
+            now = time.monotonic()
+            if now - checked < self.handler_check_interval:
+                return handler
+            if module in self.lib.allmodules.modules:
+                self._watcher_q_handlers[(name, method)] = (module, handler, now)
+                return handler
+        module = self.lib.lookup(name)
+        if not hasattr(module, method):
+            self._watcher_q_handlers.pop((name, method), None)
+            return None
+        handler = getattr(module, method)
+        self._watcher_q_handlers[(name, method)] = (module, handler, time.monotonic())
+        return handler
+
+    async def __queue_method_handler(self, name: str, method: str, shard: int = 0):
         """
         Handles the queue for a module
         :param name: The name of the module
         :param method: The method to use for the queue
-        :return: Message Object
+        :param shard: The worker queue to handle
+        :return: Message Object or list of Message Objects in batch mode
         """
+        config = self._watcher_q_config.get(name, {}).get(method, {})
+        max_batch = config.get("max_batch", 1)
+        max_latency = config.get("max_latency_ms", 0) / 1000
+        task = asyncio.current_task()
         try:
-            while True:
+            if handoff := self._watcher_q_handoff.get((name, method)):
+                await asyncio.wait({handoff})
+            while not self._stopping and task not in self._watcher_q_retired:
                 try:
-                    msg = await self._watcher_q_queue[name][method].get()
-                    await getattr(self.lib.lookup(name), method)(msg) if hasattr(
-                        self.lib.lookup(name), method
-                    ) else self.unregister(name, method)
+                    stats = self._watcher_q_stats[name][method]
+                    queue = self._watcher_q_queue[name][method][shard]
+                    entries = (
+                        await queue.get_batch(max_batch, max_latency)
+                        if max_batch > 1
+                        else [await queue.get()]
+                    )
                 except KeyError:
                     self.utils.log(
                         logging.DEBUG,
@@ -516,24 +1648,818 @@ class ApodiktumWatcherQueue(loader.Module):
                         debug_msg=True,
                     )
                     break
+                self._watcher_q_busy.add(task)
+                if queue.debounce:
+                    entries = [await queue.settle(entry) for entry in entries]
+                started = time.monotonic()
+                for entry in entries:
+                    stats["latency"][
+                        bisect.bisect_left(
+                            self.stats_buckets, (started - entry.ts) * 1000
+                        )
+                    ] += 1
+                msg = (
+                    [entry.message for entry in entries]
+                    if max_batch > 1
+                    else entries[0].message
+                )
+                try:
+                    if handler := self.__handler(name, method):
+                        await handler(msg)
+                    elif not self._stopping and task not in self._watcher_q_retired:
+                        self.unregister(name, method)
                 except Exception as exc:
+                    stats["exceptions"] += 1
                     self.utils.log(
                         logging.ERROR,
                         name,
                         f"Exception in method `{method}` of `{name}`:\n{exc}",
                         exc_info=True,
                     )
-                    continue
+                stats["handler_time"][
+                    bisect.bisect_left(
+                        self.stats_buckets, (time.monotonic() - started) * 1000
+                    )
+                ] += 1
+                stats["processed"] += len(entries)
+                self._watcher_q_busy.discard(task)
+            return
+        except asyncio.CancelledError:
             return
+
+
+class ApodiktumEntityCache:
+    """
+    Size bounded LRU cache of resolved entities with a TTL, unresolvable entities
+    are cached as well and concurrent lookups of the same entity share one request.
+    Size and TTLs are read from the library config, so config changes apply to the
+    cached entities right away
+    """
+
+    def __init__(self, client, config):
+        self._client = client
+        self._config = config
+        self._cache = collections.OrderedDict()
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._config["entity_cache_size"]
+
+    @property
+    def ttl(self) -> int:
+        return self._config["entity_cache_ttl"]
+
+    @property
+    def negative_ttl(self) -> int:
+        return self._config["entity_cache_negative_ttl"]
+
+    async def get(self, entity: EntityLike, force: bool = False) -> EntityLike:
+        """
+        Gets an entity from the cache or resolves it
+        :param entity: ID, username or peer of the entity
+        :param force: Whether to bypass the cache
+        :return: The entity, raises ValueError if it can't be resolved
+        """
+        try:
+            stored, result = self._cache[entity]
+        except KeyError:
+            pass
+        except TypeError:
+            self.misses += 1
+            return await self._client.get_entity(entity)
+        else:
+            negative = isinstance(result, ValueError)
+            if not force and time.monotonic() - stored < (
+                self.negative_ttl if negative else self.ttl
+            ):
+                self._cache.move_to_end(entity)
+                if negative:
+                    self.negative_hits += 1
+                    raise ValueError(*result.args)
+                self.hits += 1
+                return result
+            self._cache.pop(entity)
+        if entity in self._pending:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._pending[entity] = asyncio.ensure_future(
+                self._client.get_entity(entity)
+            )
+            self._pending[entity].add_done_callback(
+                functools.partial(self.__resolved, entity)
+            )
+        return await asyncio.shield(self._pending[entity])
+
+    def __resolved(self, entity: EntityLike, future: asyncio.Future):
+        self._pending.pop(entity, None)
+        if future.cancelled():
+            return
+        if (exc := future.exception()) is None:
+            self.__store(entity, future.result(), self.ttl)
+        elif isinstance(exc, ValueError):
+            self.__store(entity, exc, self.negative_ttl)
+
+    def __store(self, entity: EntityLike, result: Any, ttl: int):
+        maxsize = self.maxsize
+        if not maxsize or not ttl:
+            return
+        self._cache[entity] = (time.monotonic(), result)
+        self._cache.move_to_end(entity)
+        while len(self._cache) > maxsize:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, entity: Optional[EntityLike] = None):
+        """
+        Removes an entity from the cache
+        :param entity: The entity to remove, None to clear the cache
+        :return: None
+        """
+        if entity is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(entity, None)
+
+    def stats(self) -> dict:
+        """
+        Gets the statistics of the cache
+        :return: The statistics as dict
+        """
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0,
+        }
+
+
+class ApodiktumInviteLinkCache:
+    """
+    Invite links of private chats cached with a TTL in the library db, so they
+    survive restarts, links are refreshed in the background shortly before they
+    expire and concurrent requests for the same chat share one request. The TTL
+    is read from the library config, so config changes apply to cached links
+    right away
+    """
+
+    def __init__(self, client, db, libclassname: str, config):
+        self._client = client
+        self._db = db
+        self._config = config
+        # entries: [link, fetched timestamp, expire date of the invite or 0]
+        self._links = db.setdefault(libclassname, {}).setdefault("invite_links", {})
+        self._pending = {}
+        now = time.time()
+        for chat_id in [
+            key
+            for key, cached in self._links.items()
+            if len(cached) != 3 or self.__expires(cached) <= now
+        ]:
+            del self._links[chat_id]
+
+    @property
+    def ttl(self) -> int:
+        return self._config["invite_link_ttl"]
+
+    def __expires(self, cached: list) -> float:
+        expires = cached[1] + self.ttl
+        return min(expires, cached[2]) if cached[2] else expires
+
+    async def get(self, chat: Channel, force: bool = False) -> Optional[str]:
+        """
+        Gets the invite link of a chat from the cache or requests it
+        :param chat: The chat
+        :param force: Whether to bypass the cache
+        :return: The invite link or None if the chat has none
+        """
+        cached = self._links.get(str(chat.id))
+        if cached and not force:
+            remaining = self.__expires(cached) - time.time()
+            if remaining > 0:
+                if remaining < self.ttl / 5:
+                    self.__request(chat)
+                return cached[0]
+        return await asyncio.shield(self.__request(chat))
+
+    def __request(self, chat: Channel) -> asyncio.Future:
+        if chat.id not in self._pending:
+            self._pending[chat.id] = asyncio.ensure_future(self.__fetch(chat))
+            self._pending[chat.id].add_done_callback(
+                functools.partial(self.__fetched, chat.id)
+            )
+        return self._pending[chat.id]
+
+    def __fetched(self, chat_id: int, future: asyncio.Future):
+        self._pending.pop(chat_id, None)
+        if not future.cancelled() and (exc := future.exception()) is not None:
+            logger.debug(f"Can't refresh the invite link of {chat_id}: {exc}")
+
+    async def __fetch(self, chat: Channel) -> Optional[str]:
+        invite = (
+            await self._client(GetFullChannelRequest(channel=chat))
+        ).full_chat.exported_invite
+        if invite is None or not self.ttl:
+            self._links.pop(str(chat.id), None)
+        else:
+            self._links[str(chat.id)] = [
+                invite.link,
+                time.time(),
+                invite.expire_date.timestamp() if invite.expire_date else 0,
+            ]
+        self._db.save()
+        return invite.link if invite else None
+
+    def invalidate(self, chat_id: Optional[int] = None):
+        """
+        Removes the invite link of a chat from the cache, e.g. after revoking it
+        :param chat_id: The chat id, None to clear the cache
+        :return: None
+        """
+        if chat_id is None:
+            self._links.clear()
+        else:
+            self._links.pop(str(chat_id), None)
+        self._db.save()
+
+
+class ApodiktumRateLimiter:
+    """
+    Token buckets for the requests of the moderation helpers, one global and one
+    per chat, separately for the inline bot (bot API) and the client (MTProto).
+    A FloodWait pauses the bucket of the chat and the request waits and is retried
+    instead of being dropped. The limits are read from the library config on
+    every request, so config changes apply right away
+    """
+
+    def __init__(self, config):
+        self._config = config
+        self._buckets = {}
+        self.requests = 0
+        self.delayed = 0
+        self.flood_waits = 0
+
+    @property
+    def rate(self) -> float:
+        return self._config["rate_limit"]
+
+    @property
+    def chat_rate(self) -> float:
+        return self._config["rate_limit_chat"]
+
+    @property
+    def max_flood_wait(self) -> int:
+        return self._config["max_flood_wait"]
+
+    def __delay(self, key: tuple, rate: float, now: float) -> float:
+        # bucket: [tokens, last refill, paused until]
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= 1000:
+                self.__prune(now)
+            bucket = self._buckets[key] = [max(rate, 1), now, 0.0]
+        if rate:
+            bucket[0] = min(max(rate, 1), bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[2] > now:
+            return bucket[2] - now
+        return 0.0 if not rate or bucket[0] >= 1 else (1 - bucket[0]) / rate
+
+    def __prune(self, now: float):
+        for key in [
+            key
+            for key, (_, refill, paused) in self._buckets.items()
+            if key[1] is not None and now - refill > 60 and paused <= now
+        ]:
+            del self._buckets[key]
+
+    async def acquire(self, path: str, chat_id: Optional[int] = None):
+        """
+        Waits until the global and the chat bucket allow a request
+        :param path: "bot" or "client"
+        :param chat_id: The chat of the request
+        :return: None
+        """
+        delayed = False
+        while True:
+            now = time.monotonic()
+            rate, chat_rate = self.rate, self.chat_rate
+            delay = max(
+                self.__delay((path, None), rate, now),
+                self.__delay((path, chat_id), chat_rate, now)
+                if chat_id is not None
+                else 0.0,
+            )
+            if delay <= 0:
+                break
+            delayed = True
+            await asyncio.sleep(delay)
+        if rate:
+            self._buckets[(path, None)][0] -= 1
+        if chat_id is not None and chat_rate:
+            self._buckets[(path, chat_id)][0] -= 1
+        self.requests += 1
+        self.delayed += delayed
+
+    def pause(self, path: str, chat_id: Optional[int], seconds: float):
+        """
+        Pauses a bucket, e.g. after a FloodWait
+        :param path: "bot" or "client"
+        :param chat_id: The chat, None for the global bucket
+        :param seconds: The time to pause in seconds
+        :return: None
+        """
+        now = time.monotonic()
+        rate = self.rate if chat_id is None else self.chat_rate
+        self.__delay((path, chat_id), rate, now)
+        bucket = self._buckets[(path, chat_id)]
+        bucket[2] = max(bucket[2], now + seconds)
+
+    async def run(
+        self,
+        path: str,
+        chat_id: Optional[int],
+        func: Callable,
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Runs a request when the buckets allow it, retries it after FloodWaits up to
+        `max_flood_wait` seconds
+        :param path: "bot" or "client"
+        :param chat_id: The chat of the request
+        :param func: The request coroutine function
+        :return: The result of the request
+        """
+        while True:
+            await self.acquire(path, chat_id)
+            try:
+                return await func(*args, **kwargs)
+            except (FloodWaitError, RetryAfter) as exc:
+                seconds = (
+                    exc.seconds if isinstance(exc, FloodWaitError) else exc.timeout
+                )
+                if seconds > self.max_flood_wait:
+                    raise
+                self.flood_waits += 1
+                self.pause(path, chat_id, seconds)
+
+    def stats(self) -> dict:
+        """
+        Gets the statistics of the rate limiter
+        :return: The statistics as dict
+        """
+        now = time.monotonic()
+        return {
+            "requests": self.requests,
+            "delayed": self.delayed,
+            "flood_waits": self.flood_waits,
+            "paused": [
+                {"path": path, "chat_id": chat_id, "seconds": paused - now}
+                for (path, chat_id), (_, _, paused) in self._buckets.items()
+                if paused > now
+            ],
+        }
+
+
+class ApodiktumDeleteScheduler:
+    """
+    Delayed deletions of `delete_message` in one heap driven by a single task
+    instead of a sleeping coroutine per message. The heap is kept in the library
+    db, so scheduled deletions are loaded again after restarts and updates.
+    An entry stays in the db until its deletion succeeded, failed deletions are
+    retried with a growing delay
+    """
+
+    # seconds a running deletion stays leased before it is run again (e.g. after
+    # a restart), longer than the FloodWaits the rate limiter waits for
+    lease = 900
+    # delay of the first retry in seconds, doubled for every further retry
+    retry_delay = 30
+    max_retries = 5
+
+    def __init__(self, db, libclassname: str, delete: Callable):
+        self._db = db
+        self._delete = delete
+        # entries: [due timestamp, chat_id, message_id, use_bot, batch, retries],
+        # retries is -1 once the entry is done
+        self._heap = db.setdefault(libclassname, {}).setdefault(
+            "scheduled_deletions", []
+        )
+        self.__compact()
+        self._wakeup = None
+        self._task = None
+        # changes of the heap are saved by the task at most once per interval
+        self._save_interval = 1
+        self._saved = 0
+        self._dirty = False
+
+    def start(self):
+        """
+        Starts the task of the scheduler if it isn't running
+        :return: None
+        """
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self.__run())
+
+    def stop(self):
+        """
+        Stops the task of the scheduler, the scheduled deletions stay in the db
+        :return: None
+        """
+        if self._task is not None:
+            self._task.cancel()
+        if self._dirty:
+            self.__save()
+
+    def schedule(
+        self,
+        delay: float,
+        chat_id: int,
+        message_id: int,
+        use_bot: bool = True,
+        batch: bool = False,
+    ):
+        """
+        Schedules the deletion of a message
+        :param delay: The time in seconds to wait before deleting the message
+        :param chat_id: The chat id
+        :param message_id: The message id
+        :param use_bot: Whether to use the inline bot or not
+        :param batch: Whether to delete the message in a batch
+        :return: None
+        """
+        entry = [
+            time.time() + delay,
+            chat_id,
+            message_id,
+            bool(use_bot),
+            bool(batch),
+            0,
+        ]
+        heapq.heappush(self._heap, entry)
+        self.start()
+        if self._heap[0] is entry:
+            self._wakeup.set()
+        self.__changed()
+
+    @staticmethod
+    def __done(entry: list) -> bool:
+        return len(entry) > 5 and entry[5] < 0
+
+    def __compact(self):
+        # done entries are dropped at once if they are the majority of the heap,
+        # otherwise they are popped when they are due
+        self._heap[:] = [entry for entry in self._heap if not self.__done(entry)]
+        heapq.heapify(self._heap)
+        self._done = 0
+
+    def __changed(self):
+        if not self._dirty and self._wakeup is not None:
+            self._wakeup.set()
+        self._dirty = True
+
+    def __save(self):
+        self._db.save()
+        self._saved = time.time()
+        self._dirty = False
+
+    async def __run(self):
+        try:
+            while True:
+                self._wakeup.clear()
+                now = time.time()
+                if self._dirty and now - self._saved >= self._save_interval:
+                    self.__save()
+                delay = self._heap[0][0] - now if self._heap else None
+                if self._dirty:
+                    save_in = self._saved + self._save_interval - now
+                    delay = save_in if delay is None else min(delay, save_in)
+                if delay is None:
+                    await self._wakeup.wait()
+                    continue
+                if delay > 0:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    continue
+                while self._heap and self._heap[0][0] <= now:
+                    entry = self._heap[0]
+                    if self.__done(entry):
+                        heapq.heappop(self._heap)
+                        self._done = max(self._done - 1, 0)
+                    else:
+                        # the entry stays in the db while the deletion runs
+                        entry[0] = now + self.lease
+                        heapq.heapreplace(self._heap, entry)
+                        asyncio.ensure_future(self.__delete(entry))
+                    self._dirty = True
         except asyncio.CancelledError:
             return
 
+    async def __delete(self, entry: list):
+        _, chat_id, message_id, use_bot, batch, *retries = entry
+        retries = retries[0] if retries else 0
+        try:
+            deleted = await self._delete(chat_id, message_id, use_bot, batch)
+        except Exception as exc:  # skipcq: PYL-W0703
+            logger.debug(f"Scheduled deletion of {message_id} in {chat_id} failed: {exc}")
+            deleted = False
+        if len(entry) > 5:
+            entry[5] = -1
+        else:
+            entry.append(-1)
+        self._done += 1
+        if not deleted and retries < self.max_retries:
+            retry = [
+                time.time() + self.retry_delay * 2**retries,
+                chat_id,
+                message_id,
+                use_bot,
+                batch,
+                retries + 1,
+            ]
+            heapq.heappush(self._heap, retry)
+            if self._heap[0] is retry:
+                self._wakeup.set()
+        if self._done * 2 > len(self._heap):
+            self.__compact()
+        self.__changed()
+
+
+class ApodiktumEmojiScanner:
+    """
+    Emoji automaton built once from `emoji.EMOJI_DATA`, it follows the tokenizer of
+    the emoji package (longest sequence, ZWJ and variation selector handling) but
+    yields spans instead of building strings and skips runs of other characters
+    with one regex search, so callers can stop at the first deciding token
+    """
+
+    _zwj = "\u200d"
+    _variation_selectors = ("\ufe0e", "\ufe0f")
+
+    def __init__(self):
+        self._data = emoji.EMOJI_DATA
+        self._component = emoji.STATUS["component"]
+        self._tree = {}
+        for emj in self._data:
+            node = self._tree
+            for char in emj:
+                node = node.setdefault(char, {})
+            node["data"] = True
+        # Astral characters are matched as a whole range: a class listing every
+        # emoji start is checked range by range by `re` and costs microseconds per
+        # character, the few astral non-emoji are sorted out by the scanner itself
+        self._next = re.compile(
+            "["
+            + re.escape(
+                "".join(char for char in self._tree if char <= "\uffff") + self._zwj
+            )
+            + "\U00010000-\U0010ffff]"
+        )
+
+    def tokens(self, text: str) -> Iterator[Tuple[int, int, bool]]:
+        """
+        Yields the tokens of the text
+        :param text: text
+        :return: Generator of (start, end, is_emoji), other characters come as runs,
+                 variation selectors and ZWJ joining emoji are no tokens
+        """
+        tree, data, zwj = self._tree, self._data, self._zwj
+        pending = []
+        ignore = set()
+        length = len(text)
+        i = 0
+        while i < length:
+            char = text[i]
+            if i in ignore:
+                i += 1
+                continue
+            if char in tree:
+                j = i + 1
+                node = tree[char]
+                while j < length and text[j] in node and j not in ignore:
+                    node = node[text[j]]
+                    j += 1
+                if "data" in node:
+                    pending.append((i, j, True))
+                    i = j
+                    continue
+            elif (
+                char == zwj
+                and pending
+                and text[pending[-1][0] : pending[-1][1]] in data
+                and i > 0
+                and text[i - 1] in tree
+            ):
+                ignore.add(i)
+                start, end, _ = pending[-1]
+                if data[text[start:end]]["status"] == self._component:
+                    i -= sum(end - start for start, end, _ in pending[-2:])
+                    if text[i] == zwj:
+                        i += 1
+                        del pending[-1]
+                    else:
+                        del pending[-2:]
+                else:
+                    i -= end - start
+                    del pending[-1]
+                continue
+            elif char != zwj:
+                yield from pending
+                pending.clear()
+                match = self._next.search(text, i + 1)
+                end = match.start() if match else length
+                if i + 1 < end:
+                    yield i, end - 1, False
+                if text[end - 1] not in self._variation_selectors:
+                    pending.append((end - 1, end, False))
+                i = end
+                continue
+            elif pending:
+                yield from pending
+                pending.clear()
+            if char not in self._variation_selectors:
+                pending.append((i, i + 1, False))
+            i += 1
+        yield from pending
+
+    def __others(self, text: str, start: int, end: int) -> int:
+        return (
+            end
+            - start
+            - text.count(self._variation_selectors[0], start, end)
+            - text.count(self._variation_selectors[1], start, end)
+        )
+
+    def is_emoji(self, text: str) -> bool:
+        """
+        Checks if the text is only emoji
+        :param text: text
+        :return: True if text is only emoji, False otherwise
+        """
+        if not text:
+            return False
+        return all(
+            is_emoji or not self.__others(text, start, end)
+            for start, end, is_emoji in self.tokens(text)
+        )
+
+    def has_emoji(self, text: str) -> bool:
+        """
+        Checks if the text contains emoji
+        :param text: text
+        :return: True if text contains emoji, False otherwise
+        """
+        return any(is_emoji for _, _, is_emoji in self.tokens(text))
+
+    def count_emoji(self, text: str) -> int:
+        """
+        Counts the emoji of the text, a sequence counts as one emoji
+        :param text: text
+        :return: The amount of emoji
+        """
+        return sum(is_emoji for _, _, is_emoji in self.tokens(text))
+
+    def emoji_ratio(self, text: str) -> float:
+        """
+        Gets the share of emoji in the text, every emoji and every other
+        character count as one
+        :param text: text
+        :return: The ratio between 0 and 1
+        """
+        emojis = others = 0
+        for start, end, is_emoji in self.tokens(text):
+            if is_emoji:
+                emojis += 1
+            else:
+                others += self.__others(text, start, end)
+        return emojis / (emojis + others) if emojis else 0.0
+
+
+class ApodiktumEmojiListScanner(ApodiktumEmojiScanner):
+    """
+    Fallback of the emoji automaton for emoji<2.0, which lacks `emoji.EMOJI_DATA`
+    and `emoji.STATUS`, the tokens are built from `emoji.emoji_list`
+    """
+
+    def __init__(self):  # pylint: disable=super-init-not-called
+        pass
+
+    def tokens(self, text: str) -> Iterator[Tuple[int, int, bool]]:
+        """
+        Yields the tokens of the text
+        :param text: text
+        :return: Generator of (start, end, is_emoji), other characters come as runs
+        """
+        end = 0
+        for match in emoji.emoji_list(text):
+            if match["match_start"] > end:
+                yield end, match["match_start"], False
+            yield match["match_start"], match["match_end"], True
+            end = match["match_end"]
+        if end < len(text):
+            yield end, len(text), False
+
+
+def _emoji_scanner() -> ApodiktumEmojiScanner:
+    """
+    Gets the emoji scanner, it is built on first use, so an old emoji package
+    doesn't break the import of the library
+    :return: The emoji scanner
+    """
+    global _EMOJI_SCANNER  # skipcq: PYL-W0603
+    if _EMOJI_SCANNER is None:
+        _EMOJI_SCANNER = (
+            ApodiktumEmojiScanner()
+            if hasattr(emoji, "EMOJI_DATA") and hasattr(emoji, "STATUS")
+            else ApodiktumEmojiListScanner()
+        )
+    return _EMOJI_SCANNER
+
+
+_EMOJI_SCANNER = None
+
+
+class ApodiktumTextAnalysis:
+    """
+    Analysis of a message text, created by `ApodiktumUtils.analyze_text`
+    """
+
+    __slots__ = ("text", "urls", "emojis", "emoji_only", "length")
+
+    def __init__(self, text: str, urls: list, emojis: list, emoji_only: bool):
+        self.text = text
+        self.urls = urls
+        self.emojis = emojis
+        self.emoji_only = emoji_only
+        self.length = len(text)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(text={self.text!r}, urls={self.urls!r},"
+            f" emojis={self.emojis!r}, emoji_only={self.emoji_only!r},"
+            f" length={self.length!r})"
+        )
+
+
+class ApodiktumModerationResult:
+    """
+    Result of a job of `ApodiktumUtils.moderate`
+    """
+
+    __slots__ = ("chat_id", "user_id", "action", "duration", "result", "error")
+
+    def __init__(
+        self,
+        chat_id: int,
+        user_id: int,
+        action: str,
+        duration: int,
+        result: Any = None,
+        error: Optional[Exception] = None,
+    ):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.action = action
+        self.duration = duration
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the action was done
+        """
+        return self.error is None and bool(self.result)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(chat_id={self.chat_id!r},"
+            f" user_id={self.user_id!r}, action={self.action!r},"
+            f" duration={self.duration!r}, ok={self.ok!r}, error={self.error!r})"
+        )
+
 
 class ApodiktumUtils(loader.Module):
     """
     This class is used to handle all the utility functions of the library.
     """
 
+    # participants per request of `iter_participants`
+    participants_page_size = 200
+    # compiled string tables of this many modules are kept
+    strings_cache_size = 64
+
     def __init__(
         self,
         lib: loader.Library,
@@ -547,6 +2473,15 @@ class ApodiktumUtils(loader.Module):
         self._chats_db = self._lib_db.setdefault("chats", {})
         self._perms_cache = {}
         self._get_fullchannelrequest_cache = {}
+        self._entity_cache = lib._entity_cache
+        self._invite_links = lib._invite_links
+        self._rate_limiter = lib._rate_limiter
+        self._delete_batches = {}
+        self._delete_scheduler = ApodiktumDeleteScheduler(
+            self._db, self._libclassname, self.__delete
+        )
+        self._strings_cache = collections.OrderedDict()
+        self._user_id_paths = {}
         self.log(
             logging.DEBUG,
             self._libclassname,
@@ -578,36 +2513,84 @@ class ApodiktumUtils(loader.Module):
         :param message: The message to check for forced chat strings
         :return: The translated string
         """
-        base_strings = "strings"
-        default_lang = None
+        default_lang = (
+            self._db["hikka.translations"].get("lang")
+            if "hikka.translations" in self._db
+            else None
+        )
+        # LRU keyed by id, the entry keeps the strings dict, so its id isn't reused
+        # while cached, old dicts of reloaded modules are evicted
+        cached = self._strings_cache.get(id(all_strings))
+        if cached is None or cached[0] is not all_strings or cached[1] != default_lang:
+            tables = (
+                cached[2]
+                if cached and cached[0] is all_strings
+                else self.__compile_strings(all_strings)
+            )
+            cached = self._strings_cache[id(all_strings)] = (
+                all_strings,
+                default_lang,
+                tables,
+                tables.get(default_lang, tables["strings"]),
+            )
+            while len(self._strings_cache) > self.strings_cache_size:
+                self._strings_cache.popitem(last=False)
+        self._strings_cache.move_to_end(id(all_strings))
         if (
-            "hikka.translations" in self._db
-            and "lang" in self._db["hikka.translations"]
+            message
+            and self._chats_db
+            and (forced_lang := self.get_forced_lang(utils.get_chat_id(message)))
+            in cached[2]
+            and (forced := cached[2][forced_lang].get(string)) is not None
         ):
-            default_lang = self._db["hikka.translations"]["lang"]
-        languages = {base_strings: all_strings[base_strings]}
+            return forced
+        return cached[3][string]
+
+    def get_forced_lang(self, chat_id: int) -> Optional[str]:
+        """
+        Gets the forced language of a chat
+        :param chat_id: The chat id
+        :return: The forced language or None
+        """
+        chat_db = self._chats_db.get(str(chat_id))
+        return chat_db.get("forced_lang") if isinstance(chat_db, dict) else None
+
+    def set_forced_lang(self, chat_id: int, lang: Optional[str] = None):
+        """
+        Sets the forced language of a chat, used by `get_str` for messages
+        of that chat
+        :param chat_id: The chat id
+        :param lang: The language (e.g. `de`), None to remove it
+        :return: None
+        """
+        if lang:
+            self._chats_db.setdefault(str(chat_id), {})["forced_lang"] = lang
+        elif isinstance(chat_db := self._chats_db.get(str(chat_id)), dict):
+            chat_db.pop("forced_lang", None)
+        self._db.save()
+
+    @staticmethod
+    def __compile_strings(all_strings: dict) -> dict:
+        """
+        Compiles the immutable string tables of a module, every language is
+        merged over the base strings and `<br>` is already substituted
+        :param all_strings: The dictionary of all strings of the module
+        :return: The string tables as {lang: strings}, the base as `strings`
+        """
+        def compile_table(strings: dict) -> dict:
+            return {
+                key: value.replace("<br>", "\n") if isinstance(value, str) else value
+                for key, value in strings.items()
+            }
+
+        base = compile_table(all_strings["strings"])
+        tables = {"strings": MappingProxyType(base)}
         for lang in all_strings:
             if len(lang.split("_", 1)) == 2:
-                languages[lang.split("_", 1)[1]] = {
-                    **all_strings[base_strings],
-                    **all_strings[lang],
-                }
-        if message:
-            if chat_id := utils.get_chat_id(message):
-                chatid_db = self._chats_db.setdefault(str(chat_id), {})
-                forced_lang = chatid_db.get("forced_lang")
-                for lang, strings in languages.items():
-                    if lang and forced_lang == lang:
-                        if string in strings:
-                            return strings[string].replace("<br>", "\n")
-                        break
-        if (
-            default_lang
-            and default_lang in list(languages)
-            and string in languages[default_lang]
-        ):
-            return languages[default_lang][string].replace("<br>", "\n")
-        return all_strings[base_strings][string].replace("<br>", "\n")
+                tables[lang.split("_", 1)[1]] = MappingProxyType(
+                    {**base, **compile_table(all_strings[lang])}
+                )
+        return tables
 
     def log(
         self,
@@ -650,6 +2633,33 @@ class ApodiktumUtils(loader.Module):
             else None
         )
 
+    async def get_entity_cached(
+        self,
+        entity: EntityLike,
+        force: Optional[bool] = False,
+    ) -> EntityLike:
+        """
+        Gets an entity from the shared entity cache
+        :param entity: ID, username or peer of the entity
+        :param force: Whether to force a refresh of the cache
+        :return: The entity, raises ValueError if it can't be resolved
+        """
+        return await self._entity_cache.get(entity, force=force)
+
+    def get_entity_cache_stats(self) -> dict:
+        """
+        Gets the statistics of the shared entity cache
+        :return: size, maxsize, hits, negative_hits, misses, evictions and hit_rate
+        """
+        return self._entity_cache.stats()
+
+    def get_rate_limit_stats(self) -> dict:
+        """
+        Gets the statistics of the rate limiter of the moderation helpers
+        :return: Requests, delayed requests, FloodWaits and paused buckets as dict
+        """
+        return self._rate_limiter.stats()
+
     async def is_member(
         self,
         chat: EntityLike,
@@ -671,6 +2681,120 @@ class ApodiktumUtils(loader.Module):
         except UserNotParticipantError:
             return None
 
+    async def are_members(
+        self,
+        chat: EntityLike,
+        users: list,
+        exp: Optional[int] = 5,
+        force: Optional[bool] = False,
+        concurrency: int = 10,
+    ) -> dict:
+        """
+        Checks if many users are members of a chat. The participants are listed
+        page by page until all users are found, at most one page per user, users
+        missing in an incomplete listing (e.g. hidden or too many members) are
+        checked with `is_member`
+        :param chat: Chat ID or Chat Entity
+        :param users: User IDs or User Entities
+        :param exp: The max time of cached results of single checks in seconds
+        :param force: Whether to force a refresh of the cache of single checks
+        :param concurrency: Max amount of single checks running at the same time
+        :return: Dict of user ID -> perms if the user is a member, None otherwise
+        """
+        if not users:
+            return {}
+        chat = await self.get_entity_cached(chat) if isinstance(chat, int) else chat
+        wanted = {user if isinstance(user, int) else user.id: user for user in users}
+        members = {}
+        # a listing costs one request per page, it is only used if it needs
+        # less pages than there are users to check
+        max_pages = len(wanted)
+        count = getattr(chat, "participants_count", None)
+        if (
+            not count or -(-count // self.participants_page_size) <= max_pages
+        ) and await self.__list_members(chat, wanted, members, max_pages):
+            return {user_id: members.get(user_id) for user_id in wanted}
+        missing = [user_id for user_id in wanted if user_id not in members]
+        semaphore = asyncio.Semaphore(concurrency)
+        for user_id, perms in zip(
+            missing,
+            await asyncio.gather(
+                *(
+                    self.__is_member_bounded(semaphore, chat, wanted[user_id], exp, force)
+                    for user_id in missing
+                )
+            ),
+        ):
+            members[user_id] = perms
+        return {user_id: members[user_id] for user_id in wanted}
+
+    async def __list_members(
+        self,
+        chat: EntityLike,
+        wanted: dict,
+        members: dict,
+        max_pages: int,
+    ) -> bool:
+        """
+        Lists the participants of a chat page by page through the rate limiter
+        and stores the wanted ones in members
+        :param chat: The chat
+        :param wanted: The user IDs to look for
+        :param members: Dict of user ID -> perms to fill
+        :param max_pages: The max amount of pages to request
+        :return: Whether the listing was complete
+        """
+        participants = self._client.iter_participants(
+            chat, limit=max_pages * self.participants_page_size
+        )
+        iterator = participants.__aiter__()
+        seen = 0
+        try:
+            while True:
+                if not seen % self.participants_page_size:
+                    await self._rate_limiter.acquire("client", chat.id)
+                try:
+                    participant = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                seen += 1
+                if participant.id in wanted:
+                    perms = ParticipantPermissions(
+                        participant.participant, isinstance(chat, Chat)
+                    )
+                    members[participant.id] = None if perms.is_banned else perms
+                    if len(members) == len(wanted):
+                        return True
+        except Exception as exc:  # skipcq: PYL-W0703
+            self.log(
+                logging.DEBUG,
+                self._libclassname,
+                f"Can't list the participants of {chat.id}, checking one by one: {exc}",
+            )
+            return False
+        # an unknown or zero total (e.g. hidden participants of a basic group)
+        # doesn't prove that the listing is complete
+        return bool(participants.total) and seen >= participants.total
+
+    async def __is_member_bounded(
+        self,
+        semaphore: asyncio.Semaphore,
+        chat: EntityLike,
+        user: EntityLike,
+        exp: int,
+        force: bool,
+    ) -> Optional[bool]:
+        async with semaphore:
+            try:
+                return await self.is_member(chat, user, exp=exp, force=force)
+            except Exception as exc:  # skipcq: PYL-W0703
+                self.log(
+                    logging.DEBUG,
+                    self._libclassname,
+                    f"Can't check if {user} is a member of {chat.id}: {exc}",
+                )
+                return None
+
     async def is_linkedchannel(
         self,
         chat: EntityLike,
@@ -686,9 +2810,9 @@ class ApodiktumUtils(loader.Module):
         :param force: Whether to force refresh the cache
         :return: True if the message is from the linked channel, False otherwise
         """
-        chat = await self._client.get_entity(chat) if isinstance(chat, int) else chat
+        chat = await self.get_entity_cached(chat) if isinstance(chat, int) else chat
         user = (
-            await self._client.get_entity(user)
+            await self.get_entity_cached(user)
             if user and isinstance(user, int)
             else user
         )
@@ -740,7 +2864,7 @@ class ApodiktumUtils(loader.Module):
         :param WithID: Return the tag with the ID
         :return: Tag message as string
         """
-        user = await self._client.get_entity(user) if isinstance(user, int) else user
+        user = await self.get_entity_cached(user) if isinstance(user, int) else user
         if isinstance(user, Channel):
             if WithID:
                 return (
@@ -776,7 +2900,7 @@ class ApodiktumUtils(loader.Module):
         :param user: User or user ID
         :return: Tag link as string
         """
-        user = await self._client.get_entity(user) if isinstance(user, int) else user
+        user = await self.get_entity_cached(user) if isinstance(user, int) else user
         if isinstance(user, User):
             return f"tg://user?id={user.id}"
         if isinstance(user, Channel) and getattr(user, "username", None):
@@ -786,67 +2910,77 @@ class ApodiktumUtils(loader.Module):
     async def get_invite_link(
         self,
         chat: Union[Chat, int],
+        force: bool = False,
     ) -> str:
         """
         Gets the invite link for the chat (need to be admin and invite user perms)
+        Links of private chats are cached, see `invite_link_ttl` in the library config
         :param chat: Chat or chat ID
+        :param force: Whether to bypass the cache
         :return: Invite link as string
         """
-        chat = await self._client.get_entity(chat) if isinstance(chat, int) else chat
+        chat = await self.get_entity_cached(chat) if isinstance(chat, int) else chat
         if chat.username:
             link = f"https://t.me/{chat.username}"
         elif chat.admin_rights and chat.admin_rights.invite_users:
-            link = await self._client(GetFullChannelRequest(channel=chat.id))
-            link = link.full_chat.exported_invite.link
+            link = await self._invite_links.get(chat, force=force)
         else:
             link = None
         return link
 
-    async def get_user_id(self, message: Message, strip: bool = False) -> int:
+    async def get_user_id(
+        self,
+        message: Message,
+        strip: bool = False,
+        allow_network: bool = False,
+    ) -> int:
         """
         Gets the user ID from a message
         :param message: Message
         :param strip: Remove -100 from the user_id
+        :param allow_network: Whether to request the user if the message doesn't contain the ID
         :return: User ID
         """
-        try:
-            user_id = (
-                getattr(message, "sender_id", False)
-                or message.action_message.action.users[0]
+        paths = self._user_id_paths.get(type(message))
+        if paths is None:
+            paths = self._user_id_paths[type(message)] = next(
+                (
+                    _USER_ID_PATHS_BY_TYPE[cls]
+                    for cls in type(message).__mro__
+                    if cls in _USER_ID_PATHS_BY_TYPE
+                ),
+                _USER_ID_PATHS,
             )
-        except Exception:  # skipcq: PYL-W0703
-            try:
-                user_id = message.action_message.action.from_id.user_id
-            except Exception:  # skipcq: PYL-W0703
+        for path in paths:
+            if path is not None:
+                user_id = message
+                for key in path:
+                    if key.__class__ is str:
+                        user_id = getattr(user_id, key, None)
+                    elif isinstance(user_id, (list, tuple)) and len(user_id) > key:
+                        user_id = user_id[key]
+                    else:
+                        user_id = None
+                    if user_id is None:
+                        break
+            elif allow_network and hasattr(message, "get_user"):
                 try:
-                    user_id = message.from_id.user_id
+                    user_id = (await message.get_user()).id
                 except Exception:  # skipcq: PYL-W0703
-                    try:
-                        user_id = message.action_message.from_id.user_id
-                    except Exception:  # skipcq: PYL-W0703
-                        try:
-                            user_id = message.action.from_user.id
-                        except Exception:  # skipcq: PYL-W0703
-                            try:
-                                user_id = (await message.get_user()).id
-                            except Exception:  # skipcq: PYL-W0703
-                                try:
-                                    user_id = message.peer_id.channel_id
-                                except Exception:  # skipcq: PYL-W0703
-                                    try:
-                                        user_id = message.from_id
-                                    except Exception:  # skipcq: PYL-W0703
-                                        self.log(
-                                            logging.DEBUG,
-                                            self._libclassname,
-                                            "Can't extract entity from event"
-                                            f" {type(message)}",
-                                        )
-                                        return
-        if str(user_id).startswith("-100") and strip:
-            user_id = int(str(user_id)[4:])
+                    user_id = None
+            else:
+                continue
+            if type(user_id) is int and user_id:  # skipcq: PYL-C0123
+                break
         else:
-            user_id = int(user_id)
+            self.log(
+                logging.DEBUG,
+                self._libclassname,
+                f"Can't extract entity from event {type(message)}",
+            )
+            return
+        if strip and str(user_id).startswith("-100"):
+            user_id = int(str(user_id)[4:])
         return user_id
 
     @staticmethod
@@ -905,26 +3039,40 @@ class ApodiktumUtils(loader.Module):
         :return: True if the string represents a string, False otherwise
         """
         try:
-            if not isinstance(length, int):
-                if (
-                    isinstance(minimum, int)
-                    and len(list(grapheme.graphemes(str(s)))) < minimum
-                ):
-                    return False
-                if (
-                    isinstance(maximum, int)
-                    and len(list(grapheme.graphemes(str(s)))) > maximum
-                ):
-                    return False
-            elif (
-                isinstance(length, int)
-                and len(list(grapheme.graphemes(str(s)))) != length
-            ):
+            text = str(s)
+            if isinstance(length, int):
+                return _grapheme_length(text, length + 1) == length
+            check_minimum = isinstance(minimum, int)
+            # a string never has more graphemes than characters
+            check_maximum = isinstance(maximum, int) and len(text) > maximum
+            if not check_minimum and not check_maximum:
+                return True
+            count = _grapheme_length(text, maximum + 1 if check_maximum else minimum)
+            if check_minimum and count < minimum:
                 return False
-            return True
+            return not check_maximum or count <= maximum
         except TypeError:
             return False
 
+    @staticmethod
+    def validate_strings(
+        strings: list,
+        minimum: Optional[int] = None,
+        maximum: Optional[int] = None,
+        length: Optional[int] = None,
+    ) -> list:
+        """
+        Checks many strings at once, see `validate_string`
+        :param strings: Strings to check
+        :param minimum: Minimum length
+        :param maximum: Maximum length
+        :param length: Exact length
+        :return: List of True or False per string
+        """
+        return [
+            ApodiktumUtils.validate_string(s, minimum, maximum, length) for s in strings
+        ]
+
     @staticmethod
     def validate_float(
         s: Any,
@@ -1073,7 +3221,7 @@ class ApodiktumUtils(loader.Module):
         :param text: str
         :return: list of href urls
         """
-        return re.findall("href=[\"'](.*?)[\"']", text)
+        return _HREF_REGEX.findall(text)
 
     @staticmethod
     def get_urls(text: str) -> list:
@@ -1082,8 +3230,46 @@ class ApodiktumUtils(loader.Module):
         :param text: str
         :return: list of urls
         """
-        URL_REGEX = r"""(?i)\b((?:https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:\'\".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)\b/?(?!@)))"""
-        return re.findall(URL_REGEX, text)
+        return [
+            url
+            for token in _URL_TOKEN_REGEX.finditer(text)
+            for url in _URL_REGEX.findall(token.group())
+        ]
+
+    def iter_urls(
+        self,
+        text: str,
+        message: Optional[Message] = None,
+    ) -> Iterator[Tuple[str, str, int, int]]:
+        """
+        Yields all urls of the text ordered by position, the url entities of the
+        message come first. The text is only scanned as far as the urls are
+        consumed, stop iterating after the first hit to just check for links.
+        :param text: str
+        :param message: Message to merge its url entities
+        :return: Generator of (url, source, start, end), source is `entity`
+                 (offsets of the entity), `plain` or `href` (offsets in the
+                 unescaped text)
+        """
+        if message is not None:
+            for ent, url in message.get_entities_text():
+                if isinstance(ent, MessageEntityUrl):
+                    yield url, "entity", ent.offset, ent.offset + ent.length
+        if not text:
+            return
+        text = self.unescape_html(text)
+        yield from heapq.merge(
+            (
+                (match.group(1), "plain", match.start(1), match.end(1))
+                for token in _URL_TOKEN_REGEX.finditer(text)
+                for match in _URL_REGEX.finditer(text, token.start(), token.end())
+            ),
+            (
+                (match.group(1), "href", match.start(1), match.end(1))
+                for match in _HREF_REGEX.finditer(text)
+            ),
+            key=lambda url: url[2],
+        )
 
     def get_all_urls(self, text: str, rem_duplicates: bool = False) -> str:
         """
@@ -1092,9 +3278,10 @@ class ApodiktumUtils(loader.Module):
         :param rem_duplicates: True to remove duplicates from the list
         :return: list of urls
         """
-        text = self.unescape_html(text)
-        urls = []
-        urls = self.get_urls(text) + self.get_href_urls(text)
+        urls = {"plain": [], "href": []}
+        for url, source, _, _ in self.iter_urls(text):
+            urls[source].append(url)
+        urls = urls["plain"] + urls["href"]
         if rem_duplicates:
             urls = self.rem_duplicates_list(urls)
         return urls
@@ -1245,13 +3432,41 @@ class ApodiktumUtils(loader.Module):
         return chat_id, msg_id
 
     @staticmethod
-    def is_emoji(text: str) -> str:
+    def is_emoji(text: str) -> bool:
         """
         Check if text is only emoji
         :param text: text
         :return: True if text is only emoji, False otherwise
         """
-        return not emoji.replace_emoji(text, replace="") if text else False
+        return _emoji_scanner().is_emoji(text)
+
+    @staticmethod
+    def has_emoji(text: str) -> bool:
+        """
+        Check if text contains emoji, stops at the first one
+        :param text: text
+        :return: True if text contains emoji, False otherwise
+        """
+        return _emoji_scanner().has_emoji(text)
+
+    @staticmethod
+    def count_emoji(text: str) -> int:
+        """
+        Count the emoji in text, a sequence (e.g. 👨‍👩‍👧) counts as one emoji
+        :param text: text
+        :return: The amount of emoji
+        """
+        return _emoji_scanner().count_emoji(text)
+
+    @staticmethod
+    def emoji_ratio(text: str) -> float:
+        """
+        Get the share of emoji in text, every emoji and every other character
+        count as one
+        :param text: text
+        :return: The ratio between 0 and 1
+        """
+        return _emoji_scanner().emoji_ratio(text)
 
     @staticmethod
     def rem_emoji(text: str) -> str:
@@ -1280,6 +3495,69 @@ class ApodiktumUtils(loader.Module):
         """
         return emoji.emoji_list(text)
 
+    def analyze_text(
+        self,
+        text: str,
+        keep_custom_emoji: Optional[bool] = False,
+    ) -> ApodiktumTextAnalysis:
+        """
+        Analyzes a html text, every part is computed once
+        :param text: The html text (e.g. `message.text`)
+        :param keep_custom_emoji: Whether to keep custom emoji tag or not
+        :return: The raw text, its urls (like `get_all_urls`), distinct emoji,
+                 whether it is only emoji and its length
+        """
+        stripped = self.remove_html(text, keep_emoji_tag=keep_custom_emoji)
+        emojis = {}
+        emoji_only = bool(stripped)
+        for start, end, is_emoji in _emoji_scanner().tokens(stripped):
+            if is_emoji:
+                emojis[stripped[start:end]] = None
+            elif emoji_only and stripped[start:end].strip("\ufe0e\ufe0f"):
+                emoji_only = False
+        return ApodiktumTextAnalysis(
+            stripped,
+            self.get_all_urls(text),
+            list(emojis),
+            emoji_only,
+        )
+
+    async def analyze_messages(
+        self,
+        messages: list,
+        keep_custom_emoji: Optional[bool] = False,
+        chunk_size: Optional[int] = 0,
+    ) -> list:
+        """
+        Analyzes many messages, see `analyze_text`
+        :param messages: Messages or html texts
+        :param keep_custom_emoji: Whether to keep custom emoji tag or not
+        :param chunk_size: Analyze chunks of that many messages in worker threads,
+                           keeps the event loop responsive on large backlogs,
+                           0 to analyze them directly
+        :return: list of ApodiktumTextAnalysis in the order of the messages
+        """
+        texts = [
+            message if isinstance(message, str) else message.text or ""
+            for message in messages
+        ]
+        if not chunk_size or len(texts) <= chunk_size:
+            return self.__analyze_texts(texts, keep_custom_emoji)
+        chunks = await asyncio.gather(
+            *[
+                utils.run_sync(
+                    self.__analyze_texts,
+                    texts[index : index + chunk_size],
+                    keep_custom_emoji,
+                )
+                for index in range(0, len(texts), chunk_size)
+            ]
+        )
+        return [analysis for chunk in chunks for analysis in chunk]
+
+    def __analyze_texts(self, texts: list, keep_custom_emoji: bool) -> list:
+        return [self.analyze_text(text, keep_custom_emoji) for text in texts]
+
     def remove_html(
         self,
         text: str,
@@ -1473,34 +3751,15 @@ class ApodiktumUtils(loader.Module):
         :return: True if the user was muted, False if not<
         """
         duration = int(math.ceil(duration))
-        user = await self._client.get_entity(user_id)
+        user = await self.get_entity_cached(user_id)
         try:
-            if use_bot and await self.check_inlinebot(chat_id):
-                with contextlib.suppress(Exception):
-                    if isinstance(user, Channel):
-                        return await self.inline.bot.restrict_chat_member(
-                            chat_id
-                            if str(chat_id).startswith("-100")
-                            else int(f"-100{chat_id}"),
-                            user_id
-                            if str(user_id).startswith("-100")
-                            else int(f"-100{user_id}"),
-                            permissions=ChatPermissions(can_send_messages=False),
-                            until_date=timedelta(minutes=duration),
-                        )
-                    return await self.inline.bot.restrict_chat_member(
-                        chat_id
-                        if str(chat_id).startswith("-100")
-                        else int(f"-100{chat_id}"),
-                        user_id,
-                        permissions=ChatPermissions(can_send_messages=False),
-                        until_date=timedelta(minutes=duration),
-                    )
-            return await self._client.edit_permissions(
+            return await self.__moderation_action(
+                "mute",
                 chat_id,
                 user_id,
-                timedelta(minutes=duration),
-                send_messages=False,
+                user,
+                duration,
+                use_bot and await self.check_inlinebot(chat_id),
             )
         except Exception as exc:  # skipcq: PYL-W0703
             self.utils.log(
@@ -1525,31 +3784,15 @@ class ApodiktumUtils(loader.Module):
         :param use_bot: Whether to use the inline bot or not
         :return: True if the user was muted, False if not<
         """
-        user = await self._client.get_entity(user_id)
+        user = await self.get_entity_cached(user_id)
         try:
-            if use_bot and await self.check_inlinebot(chat_id):
-                with contextlib.suppress(Exception):
-                    if isinstance(user, Channel):
-                        return await self.inline.bot.restrict_chat_member(
-                            chat_id
-                            if str(chat_id).startswith("-100")
-                            else int(f"-100{chat_id}"),
-                            user_id
-                            if str(user_id).startswith("-100")
-                            else int(f"-100{user_id}"),
-                            permissions=ChatPermissions(can_send_messages=True),
-                        )
-                    return await self.inline.bot.restrict_chat_member(
-                        chat_id
-                        if str(chat_id).startswith("-100")
-                        else int(f"-100{chat_id}"),
-                        user_id,
-                        permissions=ChatPermissions(can_send_messages=True),
-                    )
-            return await self._client.edit_permissions(
+            return await self.__moderation_action(
+                "unmute",
                 chat_id,
                 user_id,
-                send_messages=True,
+                user,
+                0,
+                use_bot and await self.check_inlinebot(chat_id),
             )
         except Exception as exc:  # skipcq: PYL-W0703
             self.utils.log(
@@ -1573,26 +3816,16 @@ class ApodiktumUtils(loader.Module):
         :param use_bot: Whether to use the inline bot or not
         :return: True if the user was banned, False if not
         """
-        user = await self._client.get_entity(user_id)
+        user = await self.get_entity_cached(user_id)
         try:
-            if use_bot and await self.check_inlinebot(chat_id):
-                with contextlib.suppress(Exception):
-                    if isinstance(user, Channel):
-                        return await self.inline.bot.ban_chat_sender_chat(
-                            chat_id
-                            if str(chat_id).startswith("-100")
-                            else int(f"-100{chat_id}"),
-                            user_id
-                            if str(user_id).startswith("-100")
-                            else int(f"-100{user_id}"),
-                        )
-                    return await self.inline.bot.unban_chat_member(
-                        chat_id
-                        if str(chat_id).startswith("-100")
-                        else int(f"-100{chat_id}"),
-                        user_id,
-                    )
-            return await self._client.kick_participant(chat_id, user_id)
+            return await self.__moderation_action(
+                "kick",
+                chat_id,
+                user_id,
+                user,
+                0,
+                use_bot and await self.check_inlinebot(chat_id),
+            )
         except Exception as exc:  # skipcq: PYL-W0703
             self.utils.log(
                 logging.DEBUG,
@@ -1617,33 +3850,16 @@ class ApodiktumUtils(loader.Module):
         :param use_bot: Whether to use the inline bot or not
         :return: True if the user was banned, False if not
         """
-        user = await self._client.get_entity(user_id)
+        user = await self.get_entity_cached(user_id)
         duration = int(math.ceil(duration))
         try:
-            if use_bot and await self.check_inlinebot(chat_id):
-                with contextlib.suppress(Exception):
-                    if isinstance(user, Channel):
-                        return await self.inline.bot.ban_chat_sender_chat(
-                            chat_id
-                            if str(chat_id).startswith("-100")
-                            else int(f"-100{chat_id}"),
-                            user_id
-                            if str(user_id).startswith("-100")
-                            else int(f"-100{user_id}"),
-                        )
-                    return await self.inline.bot.kick_chat_member(
-                        chat_id
-                        if str(chat_id).startswith("-100")
-                        else int(f"-100{chat_id}"),
-                        user_id,
-                        until_date=timedelta(minutes=duration),
-                    )
-            return await self._client(
-                EditBannedRequest(
-                    chat_id,
-                    user_id,
-                    ChatBannedRights(timedelta(minutes=duration), view_messages=True),
-                )
+            return await self.__moderation_action(
+                "ban",
+                chat_id,
+                user_id,
+                user,
+                duration,
+                use_bot and await self.check_inlinebot(chat_id),
             )
         except Exception as exc:  # skipcq: PYL-W0703
             self.utils.log(
@@ -1668,31 +3884,15 @@ class ApodiktumUtils(loader.Module):
         :param use_bot: Whether to use the inline bot or not
         :return: True if the user was unbanned, False if not
         """
-        user = await self._client.get_entity(user_id)
+        user = await self.get_entity_cached(user_id)
         try:
-            if use_bot and await self.check_inlinebot(chat_id):
-                with contextlib.suppress(Exception):
-                    if isinstance(user, Channel):
-                        return await self.inline.bot.unban_chat_member(
-                            chat_id
-                            if str(chat_id).startswith("-100")
-                            else int(f"-100{chat_id}"),
-                            user_id
-                            if str(user_id).startswith("-100")
-                            else int(f"-100{user_id}"),
-                        )
-                    return await self.inline.bot.unban_chat_member(
-                        chat_id
-                        if str(chat_id).startswith("-100")
-                        else int(f"-100{chat_id}"),
-                        user_id,
-                    )
-            return await self._client(
-                EditBannedRequest(
-                    chat_id,
-                    user_id,
-                    ChatBannedRights(view_messages=False),
-                )
+            return await self.__moderation_action(
+                "unban",
+                chat_id,
+                user_id,
+                user,
+                0,
+                use_bot and await self.check_inlinebot(chat_id),
             )
         except Exception as exc:  # skipcq: PYL-W0703
             self.utils.log(
@@ -1703,45 +3903,297 @@ class ApodiktumUtils(loader.Module):
             )
             return False
 
+    async def moderate(
+        self,
+        jobs: list,
+        use_bot: Optional[bool] = True,
+        concurrency: int = 10,
+    ) -> list:
+        """
+        Runs many moderation actions, the entities and the inline bot status are
+        resolved once per chat and user
+        :param jobs: (chat_id, user_id, action) or (chat_id, user_id, action, duration)
+                     tuples, action is one of mute, unmute, kick, ban and unban,
+                     duration is in minutes like for `mute` and `ban`
+        :param use_bot: Whether to use the inline bot or not
+        :param concurrency: Max amount of actions running at the same time
+        :return: List of ApodiktumModerationResult in the order of the jobs
+        """
+        results = [
+            ApodiktumModerationResult(
+                job[0],
+                job[1],
+                job[2],
+                int(math.ceil(job[3])) if len(job) > 3 and job[3] else 0,
+            )
+            for job in jobs
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        chat_ids = list(dict.fromkeys(result.chat_id for result in results))
+        user_ids = list(
+            dict.fromkeys(
+                result.user_id
+                for result in results
+                if result.action in _MODERATION_ACTIONS
+            )
+        )
+        bots = dict(
+            zip(
+                chat_ids,
+                await asyncio.gather(
+                    *(
+                        self.__bounded(semaphore, self.check_inlinebot(chat_id))
+                        for chat_id in chat_ids
+                    ),
+                    return_exceptions=True,
+                )
+                if use_bot
+                else [False] * len(chat_ids),
+            )
+        )
+        users = dict(
+            zip(
+                user_ids,
+                await asyncio.gather(
+                    *(
+                        self.__bounded(semaphore, self.get_entity_cached(user_id))
+                        for user_id in user_ids
+                    ),
+                    return_exceptions=True,
+                ),
+            )
+        )
+        await asyncio.gather(
+            *(
+                self.__moderate_job(
+                    semaphore,
+                    result,
+                    users.get(result.user_id),
+                    bots[result.chat_id] is True,
+                )
+                for result in results
+            )
+        )
+        return results
+
+    async def __moderate_job(
+        self,
+        semaphore: asyncio.Semaphore,
+        result: ApodiktumModerationResult,
+        user: Union[EntityLike, Exception],
+        bot: bool,
+    ):
+        if result.action not in _MODERATION_ACTIONS:
+            result.error = ValueError(f"Unknown moderation action {result.action}")
+        elif isinstance(user, Exception):
+            result.error = user
+        else:
+            async with semaphore:
+                try:
+                    result.result = await self.__moderation_action(
+                        result.action,
+                        result.chat_id,
+                        result.user_id,
+                        user,
+                        result.duration,
+                        bot,
+                    )
+                except Exception as exc:  # skipcq: PYL-W0703
+                    result.error = exc
+        if result.error is not None:
+            self.utils.log(
+                logging.DEBUG,
+                self._libclassname,
+                f"Unable to {result.action} user {result.user_id} in chat"
+                f" {result.chat_id}\nError: {result.error}",
+                debug_msg=True,
+            )
+
+    @staticmethod
+    async def __bounded(semaphore: asyncio.Semaphore, coro: Any) -> Any:
+        async with semaphore:
+            return await coro
+
+    async def __moderation_action(
+        self,
+        action: str,
+        chat_id: int,
+        user_id: int,
+        user: EntityLike,
+        duration: int,
+        bot: bool,
+    ) -> Any:
+        """
+        Runs a moderation action with the inline bot if possible, else with the client
+        :param action: mute, unmute, kick, ban or unban
+        :param chat_id: The chat id
+        :param user_id: The user id
+        :param user: The entity of the user
+        :param duration: The time in minutes for mute and ban
+        :param bot: Whether the inline bot can be used in the chat
+        :return: The result of the request
+        """
+        if bot:
+            with contextlib.suppress(Exception):
+                return await self._rate_limiter.run(
+                    "bot",
+                    chat_id,
+                    self.__bot_moderation_action,
+                    action,
+                    chat_id,
+                    user_id,
+                    user,
+                    duration,
+                )
+        if action == "mute":
+            return await self._rate_limiter.run(
+                "client",
+                chat_id,
+                self._client.edit_permissions,
+                chat_id,
+                user_id,
+                timedelta(minutes=duration),
+                send_messages=False,
+            )
+        if action == "unmute":
+            return await self._rate_limiter.run(
+                "client",
+                chat_id,
+                self._client.edit_permissions,
+                chat_id,
+                user_id,
+                send_messages=True,
+            )
+        if action == "kick":
+            return await self._rate_limiter.run(
+                "client", chat_id, self._client.kick_participant, chat_id, user_id
+            )
+        return await self._rate_limiter.run(
+            "client",
+            chat_id,
+            self._client,
+            EditBannedRequest(
+                chat_id,
+                user_id,
+                ChatBannedRights(timedelta(minutes=duration), view_messages=True)
+                if action == "ban"
+                else ChatBannedRights(view_messages=False),
+            )
+        )
+
+    async def __bot_moderation_action(
+        self,
+        action: str,
+        chat_id: int,
+        user_id: int,
+        user: EntityLike,
+        duration: int,
+    ) -> Any:
+        chat_id = chat_id if str(chat_id).startswith("-100") else int(f"-100{chat_id}")
+        if isinstance(user, Channel):
+            user_id = (
+                user_id if str(user_id).startswith("-100") else int(f"-100{user_id}")
+            )
+            if action in {"kick", "ban"}:
+                return await self.inline.bot.ban_chat_sender_chat(chat_id, user_id)
+        if action == "mute":
+            return await self.inline.bot.restrict_chat_member(
+                chat_id,
+                user_id,
+                permissions=ChatPermissions(can_send_messages=False),
+                until_date=timedelta(minutes=duration),
+            )
+        if action == "unmute":
+            return await self.inline.bot.restrict_chat_member(
+                chat_id,
+                user_id,
+                permissions=ChatPermissions(can_send_messages=True),
+            )
+        if action == "ban":
+            return await self.inline.bot.kick_chat_member(
+                chat_id,
+                user_id,
+                until_date=timedelta(minutes=duration),
+            )
+        # unbanning a member removes it from the chat
+        return await self.inline.bot.unban_chat_member(chat_id, user_id)
+
     async def delete_message(
         self,
         message: Message,
         deltimer: Optional[int] = 0,
         use_bot: Optional[bool] = True,
+        batch: Optional[bool] = False,
     ) -> bool:
         """
         Deletes a message in a chat
         :param message: The message to delete
         :param deltimer: The time in seconds to wait before deleting the message
         :param use_bot: Whether to use the inline bot or not
-        :return: True if the message was deleted, False if not
+        :param batch: Whether to gather the message with other messages of the chat
+                      for `delete_batch_window` ms and delete them with one request
+                      of the client, falls back to a single deletion if it fails.
+                      Not used if the inline bot deletes the message (`use_bot`)
+        :return: True if the message was deleted, False if not. With a deltimer the
+                 deletion is scheduled in the library db (it survives restarts)
+                 and True is returned right away
         """
         chat_id = utils.get_chat_id(message)
-        chat = await self._client.get_entity(chat_id)
-        try:
-            message_id = getattr(message, "id", None) or getattr(
-                message, "message_id", None
+        message_id = getattr(message, "id", None) or getattr(
+            message, "message_id", None
+        )
+        if deltimer and message_id:
+            self._delete_scheduler.schedule(
+                deltimer, chat_id, message_id, use_bot, batch
             )
-            if deltimer:
-                await asyncio.sleep(deltimer)
-            if (
+            return True
+        return await self.__delete(chat_id, message_id, use_bot, batch)
+
+    async def __delete(
+        self,
+        chat_id: int,
+        message_id: int,
+        use_bot: bool,
+        batch: bool,
+    ) -> bool:
+        """
+        Deletes a message in a chat, see `delete_message`
+        :param chat_id: The chat id
+        :param message_id: The message id
+        :param use_bot: Whether to use the inline bot or not
+        :param batch: Whether to delete the message in a batch
+        :return: True if the message was deleted, False if not
+        """
+        chat = await self.get_entity_cached(chat_id)
+        try:
+            use_bot = (
                 use_bot
                 and await self.check_inlinebot(chat_id)
                 and isinstance(chat, (Channel, Chat))
-            ):
+            )
+            if batch and message_id and not use_bot:
+                with contextlib.suppress(Exception):
+                    return await self.__delete_batched(chat_id, message_id)
+            if use_bot:
                 with contextlib.suppress(
                     MessageCantBeDeleted,
                     BotKicked,
                     ChatNotFound,
                     MessageToDeleteNotFound,
                 ):
-                    return await self.inline.bot.delete_message(
+                    return await self._rate_limiter.run(
+                        "bot",
+                        chat_id,
+                        self.inline.bot.delete_message,
                         chat_id
                         if str(chat_id).startswith("-100")
                         else int(f"-100{chat_id}"),
                         message_id,
                     )
-            return await self._client.delete_messages(
+            return await self._rate_limiter.run(
+                "client",
+                chat_id,
+                self._client.delete_messages,
                 chat_id,
                 message_id,
             )
@@ -1754,6 +4206,71 @@ class ApodiktumUtils(loader.Module):
             )
             return False
 
+    async def __delete_batched(self, chat_id: int, message_id: int) -> Any:
+        """
+        Adds a message to the deletion batch of its chat
+        :param chat_id: The chat id
+        :param message_id: The message id
+        :return: The result of the request which deleted the message
+        """
+        batch = self._delete_batches.get(chat_id)
+        if batch is None:
+            batch = self._delete_batches[chat_id] = {}
+            asyncio.ensure_future(
+                self.__flush_deletes(
+                    chat_id, batch, self.lib.config["delete_batch_window"] / 1000
+                )
+            )
+        if message_id not in batch:
+            batch[message_id] = asyncio.get_event_loop().create_future()
+        future = batch[message_id]
+        if len(batch) >= 100:
+            del self._delete_batches[chat_id]
+            asyncio.ensure_future(self.__send_deletes(chat_id, batch))
+        return await asyncio.shield(future)
+
+    async def __flush_deletes(self, chat_id: int, batch: dict, delay: float):
+        """
+        Sends the batch after the window unless it was sent because it was full
+        :param chat_id: The chat id
+        :param batch: Message id -> future of the caller
+        :param delay: The time in seconds to wait for more messages
+        :return: None
+        """
+        await asyncio.sleep(delay)
+        if self._delete_batches.get(chat_id) is batch:
+            del self._delete_batches[chat_id]
+            await self.__send_deletes(chat_id, batch)
+
+    async def __send_deletes(self, chat_id: int, batch: dict):
+        """
+        Deletes the messages of a batch with one request
+        :param chat_id: The chat id
+        :param batch: Message id -> future of the caller
+        :return: None
+        """
+        try:
+            result = await self._rate_limiter.run(
+                "client",
+                chat_id,
+                self._client.delete_messages,
+                chat_id,
+                list(batch),
+            )
+            if not sum(getattr(affected, "pts_count", 0) for affected in result):
+                # e.g. basic groups report no error if the client can't delete
+                raise RuntimeError("No message of the batch was deleted")
+        except Exception as exc:  # skipcq: PYL-W0703
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    # callers fall back to a single deletion, mark it as retrieved
+                    future.exception()
+        else:
+            for future in batch.values():
+                if not future.done():
+                    future.set_result(result)
+
     async def asset_channel(
         self,
         title: str,
@@ -1956,12 +4473,40 @@ class ApodiktumInternal(loader.Module):
             "_watcher_q_task",
             {},
         ) or getattr(self.lib if hasattr(self, "lib") else None, "_watcher_q_task", {})
-        for name in list(self._watcher_q_task):
-            for method in list(self._watcher_q_task[name].values()):
-                method.cancel()
-        if self._watcher_q_queue:
-            self._watcher_q_queue.clear()
-        return self._watcher_q_queue, self._watcher_q_task
+        self._watcher_q_config = getattr(
+            self.watcher_q if hasattr(self, "watcher_q") else None,
+            "_watcher_q_config",
+            {},
+        ) or getattr(
+            self.lib if hasattr(self, "lib") else None, "_watcher_q_config", {}
+        )
+        self._watcher_q_stats = getattr(
+            self.watcher_q if hasattr(self, "watcher_q") else None,
+            "_watcher_q_stats",
+            {},
+        ) or getattr(self.lib if hasattr(self, "lib") else None, "_watcher_q_stats", {})
+        self._watcher_q_log = getattr(
+            self.watcher_q if hasattr(self, "watcher_q") else None,
+            "_watcher_q_log",
+            {},
+        ) or getattr(self.lib if hasattr(self, "lib") else None, "_watcher_q_log", {})
+        self._watcher_q_cursor = getattr(
+            self.watcher_q if hasattr(self, "watcher_q") else None,
+            "_watcher_q_cursor",
+            {},
+        ) or getattr(
+            self.lib if hasattr(self, "lib") else None, "_watcher_q_cursor", {}
+        )
+        if hasattr(self, "watcher_q"):
+            self.watcher_q._stop()
+        return (
+            self._watcher_q_queue,
+            self._watcher_q_task,
+            self._watcher_q_config,
+            self._watcher_q_log,
+            self._watcher_q_cursor,
+            self._watcher_q_stats,
+        )
 
 
 class ApodiktumMigrator(loader.Module):